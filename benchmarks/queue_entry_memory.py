@@ -0,0 +1,99 @@
+"""
+Compares the memory used by queued songs stored as addict Dicts and as
+QueueEntry objects.
+
+Run from the repository root:
+
+    python benchmarks/queue_entry_memory.py [count]
+
+QueueEntry is loaded from its file without importing neonbot (see ytdl_worker).
+"""
+
+import importlib.util
+import os
+import sys
+import tracemalloc
+from typing import Any, Callable
+
+from addict import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+spec = importlib.util.spec_from_file_location(
+    "queue_entry", os.path.join(ROOT, "neonbot", "classes", "queue_entry.py")
+)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)  # type: ignore
+QueueEntry = module.QueueEntry
+
+DESCRIPTION = "line of a video description\n" * 30
+
+
+def flat_entry(i: int) -> Dict:
+    """An entry like the ones from a flat playlist or search."""
+
+    return Dict(
+        _type="url",
+        ie_key="Youtube",
+        id=f"vid{i:08d}",
+        url=f"vid{i:08d}",
+        title=f"Some song title number {i}",
+        duration=215,
+        uploader="Uploader",
+        view_count=None,
+        description=None,
+    )
+
+
+def resolved_fields(i: int) -> dict:
+    """The fields parse_info returns for a resolved song."""
+
+    return dict(
+        id=f"vid{i:08d}",
+        title=f"Some song title number {i}",
+        description=DESCRIPTION[:1000] + str(i),
+        uploader="Uploader",
+        duration=215,
+        thumbnail=f"https://i.ytimg.com/vi/vid{i:08d}/hqdefault.jpg",
+        stream=f"https://r1---sn.googlevideo.com/videoplayback?expire=1600000000&id={i}" + "x" * 600,
+        acodec="opus",
+        url=f"https://www.youtube.com/watch?v=vid{i:08d}",
+        view_count=f"{1234567 + i:,}",
+        upload_date="Jan 01, 2020",
+    )
+
+
+def dict_stub(i: int) -> Dict:
+    entry = flat_entry(i)
+    entry.url = f"https://www.youtube.com/watch?v={entry.id}"
+    return entry
+
+
+def measure(make: Callable[[int], Any], count: int) -> int:
+    tracemalloc.start()
+    entries = [make(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return size
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    cases = (
+        ("stubs", dict_stub, lambda i: QueueEntry.from_flat(flat_entry(i))),
+        ("resolved", lambda i: Dict(resolved_fields(i)), lambda i: QueueEntry(**resolved_fields(i))),
+    )
+
+    for name, old, new in cases:
+        old_size = measure(old, count)
+        new_size = measure(new, count)
+        print(
+            f"{count} {name:<8}  Dict {old_size / 1024:>7.0f} KiB  "
+            f"QueueEntry {new_size / 1024:>7.0f} KiB  ({1 - new_size / old_size:.0%} less)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,11 @@ import os
 
 from discord import opus
 
-from neonbot import bot
-
 
 def main() -> None:
+    # imported here for spawned ytdl workers, see ytdl_worker
+    from neonbot import bot
+
     if not opus.is_loaded():
         opus.load_opus("./lib/libopus.so.0")
 
@@ -35,11 +35,11 @@ class Bot(commands.Bot):
         self.start_message()
 
         self.env = env
-        self.db = Database()
+        self.db = self.loop.run_until_complete(Database().connect())
         self.default_prefix = env.str("DEFAULT_PREFIX", ".")
         self.owner_ids = set(env.list("OWNER_IDS", [], subcast=int))
 
-        self.status, self.activity = self.get_presence()
+        self.status, self.activity = self.loop.run_until_complete(self.get_presence())
         self.session = ClientSession(loop=self.loop, timeout=ClientTimeout(total=30))
         self.user_agent = f"NeonBot v{__version__}"
 
@@ -52,6 +52,7 @@ class Bot(commands.Bot):
 
     def set_storage(self) -> None:
         self.commands_executed: List[str] = []
+        self.messages_skipped = 0
         self.game = Dict()
         self.music = Dict()
         self.chatbot = Dict()
@@ -71,8 +72,9 @@ class Bot(commands.Bot):
             for key, player in self.music.items():
                 cache[key] = {
                     "current_queue": player.current_queue,
+                    "position": player.position,
                     "queue": [
-                        {**queue, "requested": queue.requested.id}
+                        {**queue.to_dict(), "requested": queue.requested.id}
                         for queue in player.queue
                     ],
                 }
@@ -82,8 +84,8 @@ class Bot(commands.Bot):
         cprint(LOGO, "blue")
         log.info(f"Starting {__title__} v{__version__}")
 
-    def get_presence(self) -> Tuple[discord.Status, discord.Activity]:
-        settings = self.db.get_settings().settings
+    async def get_presence(self) -> Tuple[discord.Status, discord.Activity]:
+        settings = (await self.db.get_settings()).settings
         activity_type = settings.game.type.lower()
         activity_name = settings.game.name
         status = settings.status
@@ -99,12 +101,13 @@ class Bot(commands.Bot):
         if not self.app_info:
             self.app_info = await self.application_info()
 
-    def get_command_prefix(self) -> Union[Callable, str]:
-        return (
-            lambda _, message: self.db.get_guild(message.guild.id).config.prefix
-            if message.guild
-            else self.default_prefix
-        )
+    def get_command_prefix(self) -> Callable:
+        async def command_prefix(_: commands.Bot, message: discord.Message) -> str:
+            if not message.guild:
+                return self.default_prefix
+            return (await self.db.get_guild(message.guild.id)).config.prefix
+
+        return command_prefix
 
     def load_cogs(self) -> None:
         files = sorted(glob("neonbot/cogs/[!_]*.py"))
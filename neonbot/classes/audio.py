@@ -0,0 +1,157 @@
+import audioop
+import threading
+from typing import Callable, Optional
+
+import discord
+
+
+class GaplessAudio(discord.AudioSource):
+    """
+    Audio source that switches to a warmed up upcoming source as soon as
+    the current one ends, optionally crossfading the last seconds.
+
+    read() runs in the voice thread so the handover needs no new
+    ffmpeg process and no round trip through the event loop.
+
+    With opus, the sources must return opus packets which are passed
+    through as is. Volume is then applied by ffmpeg and crossfade is
+    turned off, since it needs pcm samples to mix.
+    """
+
+    # discord.py reads 20ms frames
+    FRAMES_PER_SECOND = 50
+
+    def __init__(
+        self,
+        source: discord.AudioSource,
+        *,
+        duration: Optional[int] = None,
+        volume: float = 1.0,
+        crossfade: int = 0,
+        opus: bool = False,
+        position: float = 0,
+    ) -> None:
+        self.current = source
+        self.length = self.to_frames(duration)
+        # the source may start at an offset of the song
+        self.position = int(position * self.FRAMES_PER_SECOND)
+
+        self.upcoming: Optional[discord.AudioSource] = None
+        self.upcoming_length: Optional[int] = None
+        self.upcoming_position = 0
+        self.on_handover: Optional[Callable[[], None]] = None
+
+        self.volume = volume
+        self.crossfade = crossfade
+        self.opus = opus
+        self.lock = threading.RLock()
+
+    def to_frames(self, duration: Optional[int]) -> Optional[int]:
+        return int(duration * self.FRAMES_PER_SECOND) if duration else None
+
+    @property
+    def elapsed(self) -> float:
+        return self.position / self.FRAMES_PER_SECOND
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """Seconds left of the current source, None if its duration is unknown."""
+
+        if not self.length:
+            return None
+        return max(self.length - self.position, 0) / self.FRAMES_PER_SECOND
+
+    def set_upcoming(
+        self,
+        source: Optional[discord.AudioSource],
+        *,
+        duration: Optional[int] = None,
+        on_handover: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Sets the source to switch to once the current one ends.
+        on_handover is called from the voice thread right after switching.
+        """
+
+        with self.lock:
+            if self.upcoming:
+                self.upcoming.cleanup()
+
+            self.upcoming = source
+            self.upcoming_length = self.to_frames(duration)
+            self.upcoming_position = 0
+            self.on_handover = on_handover
+
+    def _handover(self) -> None:
+        self.current.cleanup()
+        self.current = self.upcoming
+        self.length = self.upcoming_length
+        self.position = self.upcoming_position
+        self.upcoming = None
+        self.upcoming_length = None
+        self.upcoming_position = 0
+
+        on_handover = self.on_handover
+        self.on_handover = None
+
+        if on_handover:
+            on_handover()
+
+    def _read(self) -> bytes:
+        data = self.current.read()
+        self.position += 1
+
+        if not self.upcoming:
+            return data
+
+        if not data:
+            self._handover()
+            self.position += 1
+            return self.current.read()
+
+        remaining = self.length - self.position if self.length else None
+        crossfade = 0 if self.opus else self.crossfade * self.FRAMES_PER_SECOND
+
+        if not crossfade or remaining is None or remaining >= crossfade:
+            return data
+
+        upcoming_data = self.upcoming.read()
+        self.upcoming_position += 1
+
+        if not upcoming_data:
+            # upcoming stream failed, let the current one finish normally
+            self.set_upcoming(None)
+            return data
+
+        progress = 1 - max(remaining, 0) / crossfade
+        data = audioop.add(
+            audioop.mul(data, 2, 1 - progress),
+            audioop.mul(upcoming_data, 2, progress),
+            2,
+        )
+
+        if remaining <= 0:
+            self._handover()
+
+        return data
+
+    def read(self) -> bytes:
+        with self.lock:
+            data = self._read()
+
+        if self.opus or not data:
+            return data
+
+        return audioop.mul(data, 2, min(self.volume, 2.0))
+
+    def is_opus(self) -> bool:
+        return self.opus
+
+    def cleanup(self) -> None:
+        with self.lock:
+            self.current.cleanup()
+
+            if self.upcoming:
+                self.upcoming.cleanup()
+                self.upcoming = None
+                self.on_handover = None
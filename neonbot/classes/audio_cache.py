@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import shlex
+from collections import Counter, OrderedDict
+from typing import Optional, cast
+
+from addict import Dict
+
+from .. import bot, env
+from ..helpers.constants import FFMPEG_OPTIONS
+from ..helpers.log import Log
+from .queue_entry import QueueEntry
+
+log = cast(Log, logging.getLogger(__name__))
+
+
+class AudioCache:
+    """
+    On-disk cache of opus files for songs played at least min_plays times.
+
+    Files are evicted least recently played first once they are over
+    max_size bytes. A max_size of 0 disables the cache.
+    """
+
+    def __init__(self, directory: str, *, max_size: int, min_plays: int) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.min_plays = min_plays
+        self.plays: Counter = Counter()
+        self.downloading: set = set()
+        self.semaphore = asyncio.Semaphore(2)
+        self.files: OrderedDict = OrderedDict()
+        self.size = 0
+
+        if self.max_size:
+            self.load_files()
+
+    def get_path(self, video_id: str) -> str:
+        return os.path.join(self.directory, f"{video_id}.opus")
+
+    def load_files(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        # modification time is bumped on every play, so this restores the lru order
+        for file in sorted(os.scandir(self.directory), key=lambda f: f.stat().st_mtime):
+            if file.name.endswith(".part"):
+                os.remove(file.path)
+            elif file.name.endswith(".opus"):
+                self.files[file.name[: -len(".opus")]] = file.stat().st_size
+                self.size += file.stat().st_size
+
+        self.evict()
+
+    def get(self, video_id: str) -> Optional[str]:
+        return self.get_path(video_id) if video_id in self.files else None
+
+    def record_play(self, entry: QueueEntry) -> None:
+        if not self.max_size or not entry.id:
+            return
+
+        if entry.id in self.files:
+            self.files.move_to_end(entry.id)
+            os.utime(self.get_path(entry.id))
+            return
+
+        self.plays[entry.id] += 1
+
+        if (
+            self.plays[entry.id] >= self.min_plays
+            and entry.id not in self.downloading
+            and entry.stream is not None
+        ):
+            self.downloading.add(entry.id)
+            bot.loop.create_task(self.download(entry, entry.stream))
+
+    async def download(self, entry: QueueEntry, stream: str) -> None:
+        path = self.get_path(entry.id)
+        temp = f"{path}.part"
+
+        try:
+            async with self.semaphore:
+                process = await asyncio.create_subprocess_exec(
+                    "ffmpeg",
+                    "-y",
+                    *shlex.split(FFMPEG_OPTIONS),
+                    "-i",
+                    stream,
+                    "-vn",
+                    "-map_metadata",
+                    "-1",
+                    "-c:a",
+                    "copy" if entry.acodec == "opus" else "libopus",
+                    "-b:a",
+                    "128k",
+                    "-loglevel",
+                    "error",
+                    "-f",
+                    "opus",
+                    temp,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                _, stderr = await process.communicate()
+
+            if process.returncode != 0:
+                log.warn(f"Caching audio failed for {entry.title}: {stderr.decode()}")
+                return
+
+            os.replace(temp, path)
+            self.files[entry.id] = os.path.getsize(path)
+            self.size += self.files[entry.id]
+            self.plays.pop(entry.id, None)
+            log.info(f"Cached audio of {entry.title}")
+
+            self.evict()
+        finally:
+            self.downloading.discard(entry.id)
+            if os.path.exists(temp):
+                os.remove(temp)
+
+    def evict(self) -> None:
+        while self.files and self.size > self.max_size:
+            video_id, size = self.files.popitem(last=False)
+            self.size -= size
+            os.remove(self.get_path(video_id))
+
+    @property
+    def stats(self) -> Dict:
+        return Dict(
+            enabled=bool(self.max_size),
+            files=len(self.files),
+            size=self.size,
+            max_size=self.max_size,
+        )
+
+
+audio_cache = AudioCache(
+    "./tmp/audio",
+    max_size=env.int("AUDIO_CACHE_SIZE", 0) * 1024 * 1024,
+    min_plays=env.int("AUDIO_CACHE_PLAYS", 3),
+)
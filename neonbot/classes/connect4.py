@@ -5,6 +5,7 @@ from typing import List
 import discord
 from discord.ext import commands, tasks
 
+from ..database import GuildDatabase
 from ..helpers.constants import CHOICES_EMOJI
 from . import Embed
 
@@ -15,10 +16,10 @@ class Connect4:
     Available to only one game in a channel.
     """
 
-    def __init__(self, ctx: commands.Context):
+    def __init__(self, ctx: commands.Context, db: GuildDatabase):
         self.bot = ctx.bot
         self.channel = ctx.channel
-        self.config = self.bot.db.get_guild(ctx.guild.id).config
+        self.db = db
 
         self.reset()
 
@@ -97,7 +98,7 @@ class Connect4:
 
         self.waiting_message = await self.channel.send(
             embed=Embed(
-                f"Waiting for players to join. To join the game please use`{self.config.prefix}connect4`"
+                f"Waiting for players to join. To join the game please use`{self.db.config.prefix}connect4`"
             )
         )
 
@@ -1,17 +1,33 @@
 import asyncio
+import heapq
+import itertools
 import logging
-import random
-from typing import List, Optional, Tuple, Union, cast
+from collections import Counter, deque
+from time import time
+from typing import AsyncGenerator, AsyncIterator, List, Optional, Tuple, Union, cast
 
 import discord
 from addict import Dict
 from discord.ext import commands, tasks
 
-from ..helpers.constants import FFMPEG_OPTIONS
-from ..helpers.date import format_seconds
+from ..database import GuildDatabase
+from ..helpers.constants import (
+    AUTOPLAY_BUFFER_SIZE,
+    AUTOPLAY_HISTORY_SIZE,
+    FFMPEG_OPTIONS,
+    HYDRATE_INTERVAL,
+    PANEL_DEBOUNCE,
+    SPOTIFY_CONCURRENCY,
+    WARM_UP_SECONDS,
+)
+from ..helpers.date import date, format_seconds
+from ..helpers.exceptions import YtdlError
 from ..helpers.log import Log
 from ..helpers.utils import plural
 from . import Embed, EmbedChoices
+from .audio import GaplessAudio
+from .queue_entry import QueueEntry
+from .shuffle import ShuffleOrder
 
 log = cast(Log, logging.getLogger(__name__))
 
@@ -22,16 +38,18 @@ class Player:
     repeat, shuffle, autoplay.
     """
 
-    def __init__(self, ctx: commands.Context):
+    def __init__(self, ctx: commands.Context, db: GuildDatabase):
+        from .audio_cache import audio_cache
         from .spotify import Spotify
         from .ytdl import Ytdl
 
         self.ctx = ctx
         self.bot = ctx.bot
-        self.db = self.bot.db.get_guild(ctx.guild.id)
+        self.db = db
         self.config = self.db.config.music
         self.spotify = Spotify()
-        self.ytdl = Ytdl()
+        self.ytdl = Ytdl(key=ctx.guild.id)
+        self.audio_cache = audio_cache
 
         self.load_defaults()
 
@@ -39,38 +57,71 @@ class Player:
 
     def load_defaults(self) -> None:
         self.connection: discord.VoiceClient = None
+        self.source: Optional[GaplessAudio] = None
         self.current_queue = 0
-        self.queue: List[Dict] = []
-        self.shuffled_list: List[str] = []
-        self.messages = Dict(
-            last_playing=None, last_finished=None, paused=None, auto_paused=None
-        )
+        self.queue: List[QueueEntry] = []
+        # multiset of the video ids in queue
+        self.queue_ids: Counter = Counter()
+        self.shuffle_order = ShuffleOrder()
+        self.prefetch_task: Optional[asyncio.Task] = None
+        self.prefetch_entry: Optional[QueueEntry] = None
+        self.expirations: List[Tuple[int, int, QueueEntry]] = []
+        self.expiration_counter = itertools.count()
+        self.warm_up_handle: Optional[asyncio.TimerHandle] = None
+        self.warmed_entry: Optional[QueueEntry] = None
+        self.resume_entry: Optional[QueueEntry] = None
+        self.resume_position = 0.0
+        self.history: deque = deque(maxlen=AUTOPLAY_HISTORY_SIZE)
+        self.autoplay_buffer: deque = deque()
+        self.autoplay_seed: Optional[str] = None
+        self.autoplay_task: Optional[asyncio.Task] = None
+        self.hydrate_task: Optional[asyncio.Task] = None
+        self.hydrate_failed: set = set()
+        self.panel_task: Optional[asyncio.Task] = None
+        self.panel_state: Optional[Tuple[str, int, QueueEntry]] = None
+        self.messages = Dict(panel=None, paused=None, auto_paused=None)
 
     def _load_music_cache(self) -> None:
         cache = self.bot._music_cache.get(str(self.ctx.guild.id))
         if cache:
             self.current_queue = cache.current_queue
-            self.queue = cache.queue
+            self.queue = [QueueEntry(**queue) for queue in cache.queue]
             for queue in self.queue:
                 if queue.requested:
                     queue.requested = self.bot.get_user(queue.requested)
+                self.track_expiration(queue)
+            self.queue_ids = Counter(queue.id for queue in self.queue)
+            self.shuffle_order.reset(len(self.queue))
+            self.resume_entry = self.now_playing
+            self.resume_position = cache.position or 0
 
     @property
-    def now_playing(self) -> Dict:
+    def now_playing(self) -> Optional[QueueEntry]:
         return (
             self.queue[self.current_queue]
             if self.current_queue < len(self.queue)
-            else Dict()
+            else None
         )
 
+    @property
+    def position(self) -> float:
+        return self.source.elapsed if self.source else 0
+
     async def reset(self) -> None:
         await asyncio.gather(
-            self.bot.delete_message(self.messages.last_playing),
-            self.bot.delete_message(self.messages.last_finished),
+            self.delete_panel(),
             self.bot.delete_message(self.messages.paused),
             self.bot.delete_message(self.messages.auto_paused)
         )
 
+        if self.prefetch_task:
+            self.prefetch_task.cancel()
+        if self.autoplay_task:
+            self.autoplay_task.cancel()
+        if self.hydrate_task:
+            self.hydrate_task.cancel()
+        self.refresh_links.cancel()
+
         await self.next(stop=True)
         await self.connection.disconnect()
         self.load_defaults()
@@ -81,60 +132,452 @@ class Player:
 
         if self.messages.auto_paused:
             await self.bot.delete_message(self.messages.auto_paused)
+
+        queue, current_queue = self.queue, self.current_queue
+        resume_entry, resume_position = self.now_playing, self.position
+
         await self.reset()
 
-        msg = "Player has been reset due to timeout."
+        # keep the queue so the next play resumes where it stopped
+        self.queue, self.current_queue = queue, current_queue
+        self.queue_ids = Counter(queue.id for queue in self.queue)
+        self.shuffle_order.reset(len(self.queue))
+        self.resume_entry, self.resume_position = resume_entry, resume_position
+
+        msg = (
+            "Player has been reset due to timeout. "
+            f"`{self.ctx.prefix}play` to resume."
+        )
         log.cmd(self.ctx, msg)
         await self.ctx.send(embed=Embed(msg))
 
-    async def play(self) -> None:
+    async def resolve_entry(self, entry: QueueEntry) -> QueueEntry:
+        if entry.is_resolved:
+            log.warn(f"Link expired: {entry.title}")
+
+        info = await self.ytdl.extract_video(entry.id)
+
+        if not info:
+            raise YtdlError(
+                "Video not available or rate limited due to many song requests. Try again later."
+            )
+
+        if entry.is_resolved:
+            log.info(f"Fetched new link for {info.title}")
+
+        info.requested = entry.requested
+        self.track_expiration(info)
+        return info
+
+    def track_expiration(self, entry: QueueEntry) -> None:
+        expiration = entry.stream and self.ytdl.get_link_expiration(entry.stream)
+
+        if expiration:
+            heapq.heappush(
+                self.expirations, (expiration, next(self.expiration_counter), entry)
+            )
+
+    @tasks.loop(minutes=1)
+    async def refresh_links(self) -> None:
+        """
+        Refreshes the stream of the upcoming song before it expires.
+
+        Entries that expire but aren't up next are only dropped from the heap,
+        prefetch() refreshes them once they are.
+        """
+
+        # same margin as Ytdl.is_link_expired
+        deadline = date().timestamp() + 1800
+
+        while self.expirations and self.expirations[0][0] <= deadline:
+            _, _, entry = heapq.heappop(self.expirations)
+            index = self.get_upcoming_index()
+
+            if (
+                index is None
+                or index == self.current_queue
+                or index >= len(self.queue)
+                or self.queue[index] is not entry
+                or entry is self.prefetch_entry
+                or entry is self.warmed_entry
+            ):
+                continue
+
+            try:
+                info = await self.resolve_entry(entry)
+            except Exception as e:
+                log.warn(f"Refreshing link failed for {entry.title}: {e}")
+                continue
+
+            if index < len(self.queue) and self.queue[index] is entry:
+                self.queue[index] = info
+
+    def get_upcoming_index(self) -> Optional[int]:
+        """Predicts the index next() will play, following the same order of modes."""
+
+        if not self.queue:
+            return None
+
+        if self.config.shuffle:
+            return self.shuffle_order.peek(len(self.queue), self.current_queue)
+
+        is_last = self.current_queue == len(self.queue) - 1
+
+        if self.config.autoplay and is_last:
+            return None
+        if self.config.repeat == "single":
+            return self.current_queue
+        if is_last:
+            return 0 if self.config.repeat == "all" else None
+
+        return self.current_queue + 1
+
+    def schedule_prefetch(self) -> None:
+        if self.prefetch_task and not self.prefetch_task.done():
+            return
+
+        self.prefetch_task = self.bot.loop.create_task(self.prefetch())
+
+    async def prefetch(self) -> None:
+        """Resolves the stream of the upcoming song while the current one plays."""
+
+        index = self.get_upcoming_index()
+
+        if index is None:
+            if self.config.autoplay and self.current_queue == len(self.queue) - 1:
+                self.schedule_autoplay()
+            return
+
+        entry = self.queue[index]
+
+        if index != self.current_queue and not self.is_playable(entry):
+            self.prefetch_entry = entry
+
+            try:
+                info = await self.resolve_entry(entry)
+            except Exception as e:
+                log.warn(f"Prefetch failed for {entry.title}: {e}")
+                return
+            finally:
+                self.prefetch_entry = None
+
+            # the queue may have changed while resolving
+            if index >= len(self.queue) or self.queue[index] is not entry:
+                return
+
+            self.queue[index] = entry = info
+
+        if entry is not self.warmed_entry:
+            self.clear_upcoming()
+            self.schedule_warm_up()
+
+    def schedule_warm_up(self) -> None:
+        if not self.source or self.source.remaining is None:
+            return
+
+        delay = self.source.remaining - WARM_UP_SECONDS - (self.config.crossfade or 0)
+        self.warm_up_handle = self.bot.loop.call_later(max(delay, 0), self.warm_up)
+
+    def warm_up(self) -> None:
+        """Starts ffmpeg for the upcoming song shortly before the current one ends."""
+
+        self.warm_up_handle = None
+
+        if not self.source or self.source.remaining is None:
+            return
+
+        if self.source.remaining > WARM_UP_SECONDS + (self.config.crossfade or 0) + 1:
+            # the player was paused in the meantime
+            return self.schedule_warm_up()
+
+        index = self.get_upcoming_index()
+
+        if index is None:
+            return
+
+        entry = self.queue[index]
+
+        if not self.is_playable(entry):
+            return
+
+        if self.source.opus != self.can_passthrough():
+            # settings changed, let next() start a new source
+            return
+
+        self.source.set_upcoming(
+            self.create_source(entry, opus=self.source.opus),
+            duration=entry.duration,
+            on_handover=lambda: self.bot.loop.call_soon_threadsafe(
+                self.on_handover, entry
+            ),
+        )
+        self.warmed_entry = entry
+
+    def clear_upcoming(self) -> None:
+        if self.warm_up_handle:
+            self.warm_up_handle.cancel()
+            self.warm_up_handle = None
+
+        if self.source:
+            self.source.set_upcoming(None)
+
+        self.warmed_entry = None
+
+    def on_handover(self, entry: QueueEntry) -> None:
+        self.bot.loop.create_task(self.handover(entry))
+
+    async def handover(self, entry: QueueEntry) -> None:
+        """Moves the queue to the warmed up song the audio source switched to."""
+
+        if entry is self.warmed_entry:
+            self.warmed_entry = None
+
+        self.finished_message()
+
+        index = next((i for i, queue in enumerate(self.queue) if queue is entry), None)
+
+        if index is not None:
+            self.current_queue = index
+            self.shuffle_order.discard(index)
+
+        self.song_started(entry)
+        self.schedule_prefetch()
+        self.playing_message()
+
+    def schedule_hydrate(self) -> None:
+        if not self.hydrate_task or self.hydrate_task.done():
+            self.hydrate_task = self.bot.loop.create_task(self.hydrate())
+
+    def get_unhydrated_index(self) -> Optional[int]:
+        size = len(self.queue)
+
+        for offset in range(1, size + 1):
+            index = (self.current_queue + offset) % size
+            entry = self.queue[index]
+
+            if (
+                not entry.has_metadata
+                and entry.id not in self.hydrate_failed
+                and entry is not self.prefetch_entry
+            ):
+                return index
+
+        return None
+
+    async def hydrate(self) -> None:
+        """
+        Fills the metadata of queued stubs in playback order, one at a time
+        and only while youtube_dl is idle, so playlist shows real durations.
+
+        The extracted stream is kept too, so prefetch only extracts the song
+        again if the link expired before it was up next.
+        """
+
+        from .ytdl import ytdl_pool
+
+        while True:
+            index = self.get_unhydrated_index()
+
+            if index is None:
+                return
+
+            stats = ytdl_pool.stats
+
+            if stats.pending or stats.running >= stats.workers:
+                # leave youtube_dl to the requests users are waiting for
+                await asyncio.sleep(HYDRATE_INTERVAL)
+                continue
+
+            entry = self.queue[index]
+
+            try:
+                info = await self.ytdl.extract_video(entry.id)
+            except Exception as e:
+                log.warn(f"Hydrating {entry.title} failed: {e}")
+                info = None
+
+            if not info:
+                self.hydrate_failed.add(entry.id)
+            elif (
+                index < len(self.queue)
+                and self.queue[index] is entry
+                # handover() finds the warmed up entry by identity
+                and entry is not self.warmed_entry
+            ):
+                info.requested = entry.requested
+                self.queue[index] = info
+                self.track_expiration(info)
+            else:
+                # the entry moved or is warmed up, so only fill it in place
+                entry.hydrate(info)
+
+            await asyncio.sleep(HYDRATE_INTERVAL)
+
+    def song_started(self, entry: QueueEntry) -> None:
+        """Bookkeeping for a song that starts playing, by play() or a handover."""
+
+        self.history.append(entry.id)
+        self.audio_cache.record_play(entry)
+
+    async def play(self, *, position: float = 0, restart: bool = False) -> None:
+        self.clear_upcoming()
+
+        if (
+            self.prefetch_task
+            and self.prefetch_entry is not None
+            and self.prefetch_entry is self.now_playing
+        ):
+            # already being resolved in the background, don't extract it twice
+            await asyncio.wait([self.prefetch_task])
+
         now_playing = self.now_playing
 
-        if not now_playing.stream:
-            info = await self.ytdl.process_entry(now_playing)
-            info = self.ytdl.parse_info(info)
-            info.requested = now_playing.requested
-            self.queue[self.current_queue] = now_playing = info
+        if not now_playing:
+            return
 
-        if self.ytdl.is_link_expired(now_playing.stream):
-            log.warn(f"Link expired: {now_playing.title}")
-            info = await self.ytdl.extract_info(now_playing.id)
-            self.queue[self.current_queue] = now_playing = self.ytdl.parse_info(info)
-            log.info(f"Fetched new link for {now_playing.title}")
+        self.shuffle_order.discard(self.current_queue)
+
+        if not self.is_playable(now_playing):
+            now_playing = await self.resolve_entry(now_playing)
+            self.queue[self.current_queue] = now_playing
+
+        # restarting the same song at another position isn't another play
+        if not restart:
+            self.song_started(now_playing)
 
         try:
-            song = discord.FFmpegPCMAudio(
-                now_playing.stream, before_options=FFMPEG_OPTIONS
+            opus = self.can_passthrough()
+            self.source = GaplessAudio(
+                self.create_source(now_playing, opus=opus, position=position),
+                duration=now_playing.duration,
+                volume=self.config.volume / 100,
+                crossfade=self.config.crossfade or 0,
+                opus=opus,
+                position=position,
             )
-            source = discord.PCMVolumeTransformer(song, volume=self.config.volume / 100)
 
             def after(error: Exception) -> None:
                 if error:
                     log.warn(f"After play error: {error}")
                 self.bot.loop.create_task(self.next())
 
-            self.connection.play(source, after=after)
+            self.connection.play(self.source, after=after)
 
         except discord.ClientException:
             msg = "Error while playing the song."
             log.exception(msg)
             return await self.ctx.send(embed=Embed(msg))
 
-        await self.playing_message()
+        self.schedule_prefetch()
+        self.schedule_hydrate()
+
+        if not self.refresh_links.is_running():
+            self.refresh_links.start()
+
+        self.playing_message()
+
+    def is_playable(self, entry: QueueEntry) -> bool:
+        """Whether the entry can be played without resolving its stream first."""
+
+        if self.audio_cache.get(entry.id):
+            return True
+        return entry.stream is not None and not self.ytdl.is_link_expired(entry.stream)
+
+    def can_passthrough(self) -> bool:
+        # crossfading mixes pcm samples, so it needs decoded audio
+        return self.bot.env.bool("OPUS_PASSTHROUGH", True) and not self.config.crossfade
+
+    def create_source(
+        self, entry: QueueEntry, *, opus: bool, position: float = 0
+    ) -> discord.AudioSource:
+        """
+        Creates the ffmpeg source of a song. With opus, the stream is copied
+        without decoding when it is already opus and the volume is untouched,
+        otherwise ffmpeg encodes it instead of the voice thread.
+
+        A position is passed to ffmpeg as an input seek, so the part
+        before it is neither downloaded nor decoded.
+        """
+
+        cached = self.audio_cache.get(entry.id)
+        stream = cached or entry.stream
+        codec = "opus" if cached else entry.acodec
+
+        # the reconnect options only apply to http inputs
+        before_options = "" if cached else FFMPEG_OPTIONS
+
+        if position:
+            before_options = f"-ss {position:.2f} {before_options}"
+
+        if not opus:
+            return discord.FFmpegPCMAudio(stream, before_options=before_options)
+
+        volume = self.config.volume / 100
+
+        return discord.FFmpegOpusAudio(
+            stream,
+            codec=codec if volume == 1 else None,
+            before_options=before_options,
+            options=f"-filter:a volume={volume}" if volume != 1 else None,
+        )
+
+    async def start_playing(self) -> None:
+        if any(self.queue) and not self.ctx.voice_client:
+            self.connection = await self.ctx.author.voice.channel.connect()
+            log.cmd(self.ctx, f"Connected to {self.ctx.author.voice.channel}.")
+        if self.connection and not self.connection.is_playing():
+            position = (
+                self.resume_position if self.now_playing is self.resume_entry else 0
+            )
+            self.resume_entry = None
+            await self.play(position=position)
+
+    async def seek(self, position: float) -> None:
+        self.clear_upcoming()
+
+        if self.connection._player:
+            self.connection._player.after = None
+
+        self.connection.stop()
+        await self.play(position=position, restart=True)
+
+    async def set_volume(self, volume: int) -> None:
+        await self.update_config("volume", volume)
+
+        if not self.source:
+            return
+
+        self.source.volume = volume / 100
+
+        if self.source.is_opus() and (
+            self.connection.is_playing() or self.connection.is_paused()
+        ):
+            # passed through opus can't be scaled, so ffmpeg restarts
+            # the song where it is with the new volume filter
+            paused = self.connection.is_paused()
+            await self.seek(self.position)
+
+            if paused:
+                self.connection.pause()
 
     async def next(self, *, index: int = -1, stop: bool = False) -> None:
+        self.resume_entry = None
+
         if not stop or (stop and self.connection.is_playing()):
-            await self.finished_message(delete_after=5 if stop else None)
+            self.finished_message()
 
         if stop or index != -1:
+            self.clear_upcoming()
+
             if self.connection._player:
                 self.connection._player.after = None
 
             self.connection.stop()
 
             if stop:
+                self.source = None
                 await self.connection.disconnect()
-                await self.bot.delete_message(self.messages.last_playing)
+                await self.delete_panel()
                 return
 
             if index < len(self.queue):
@@ -150,9 +593,10 @@ class Player:
             or self.process_repeat()
         ):
             await self.play()
+        else:
+            self.source = None
 
-    async def playing_message(self, *, delete_after: Optional[int] = None) -> None:
-        config = self.config
+    def playing_message(self) -> None:
         now_playing = self.now_playing
 
         if not now_playing:
@@ -161,33 +605,9 @@ class Player:
         log.cmd(
             self.ctx, f"Now playing {now_playing.title}", user=now_playing.requested
         )
+        self.update_panel("Now Playing", now_playing)
 
-        await self.bot.delete_message(self.messages.last_playing)
-
-        footer = [
-            str(now_playing.requested),
-            format_seconds(now_playing.duration) if now_playing.duration else "N/A",
-            f"Volume: {config.volume}%",
-            f"Repeat: {config.repeat}",
-            f"Shuffle: {'on' if config.shuffle else 'off'}",
-            f"Autoplay: {'on' if config.autoplay else  'off'}",
-        ]
-
-        embed = Embed(title=now_playing.title, url=now_playing.url)
-        embed.set_author(
-            name=f"Now Playing #{self.current_queue+1}",
-            icon_url="https://i.imgur.com/SBMH84I.png",
-        )
-        embed.set_footer(
-            text=" | ".join(footer), icon_url=now_playing.requested.avatar_url
-        )
-
-        self.messages.last_playing = await self.ctx.send(
-            embed=embed, delete_after=delete_after
-        )
-
-    async def finished_message(self, *, delete_after: Optional[int] = None) -> None:
-        config = self.config
+    def finished_message(self) -> None:
         now_playing = self.now_playing
 
         if not now_playing:
@@ -198,30 +618,67 @@ class Player:
             f"Finished playing {now_playing.title}",
             user=now_playing.requested,
         )
+        self.update_panel("Finished Playing", now_playing)
 
-        await self.bot.delete_message(self.messages.last_finished)
+    def update_panel(self, status: str, entry: QueueEntry) -> None:
+        """
+        Schedules an edit of the player panel. Changes within PANEL_DEBOUNCE
+        seconds are coalesced, so skipping through songs costs one edit.
+        """
+
+        self.panel_state = (status, self.current_queue, entry)
+
+        if not self.panel_task or self.panel_task.done():
+            self.panel_task = self.bot.loop.create_task(self.refresh_panel())
+
+    async def refresh_panel(self) -> None:
+        while True:
+            await asyncio.sleep(PANEL_DEBOUNCE)
+
+            state = cast(Tuple[str, int, QueueEntry], self.panel_state)
+            panel = self.messages.panel
+            embed = self.build_panel(*state)
+
+            if panel and panel.channel.id == self.ctx.channel.id:
+                try:
+                    await panel.edit(embed=embed)
+                except discord.NotFound:
+                    self.messages.panel = await self.ctx.send(embed=embed)
+            else:
+                # no panel yet, or the player moved to another channel
+                await self.bot.delete_message(panel)
+                self.messages.panel = await self.ctx.send(embed=embed)
+
+            # changed again while the request was running
+            if self.panel_state is state:
+                return
+
+    def build_panel(self, status: str, index: int, entry: QueueEntry) -> discord.Embed:
+        config = self.config
 
         footer = [
-            str(now_playing.requested),
-            format_seconds(now_playing.duration) if now_playing.duration else "N/A",
+            str(entry.requested),
+            format_seconds(entry.duration) if entry.duration else "N/A",
             f"Volume: {config.volume}%",
             f"Repeat: {config.repeat}",
             f"Shuffle: {'on' if config.shuffle else 'off'}",
             f"Autoplay: {'on' if config.autoplay else  'off'}",
         ]
 
-        embed = Embed(title=now_playing.title, url=now_playing.url)
+        embed = Embed(title=entry.title, url=entry.url)
         embed.set_author(
-            name=f"Finished Playing #{self.current_queue+1}",
-            icon_url="https://i.imgur.com/SBMH84I.png",
-        )
-        embed.set_footer(
-            text=" | ".join(footer), icon_url=now_playing.requested.avatar_url
+            name=f"{status} #{index+1}", icon_url="https://i.imgur.com/SBMH84I.png",
         )
+        embed.set_footer(text=" | ".join(footer), icon_url=entry.requested.avatar_url)
 
-        self.messages.last_finished = await self.ctx.send(
-            embed=embed, delete_after=delete_after
-        )
+        return embed
+
+    async def delete_panel(self) -> None:
+        if self.panel_task:
+            self.panel_task.cancel()
+
+        await self.bot.delete_message(self.messages.panel)
+        self.messages.panel = None
 
     def process_repeat(self) -> bool:
         config = self.config
@@ -242,54 +699,126 @@ class Player:
         if not self.config.shuffle or len(self.queue) == 0:
             return False
 
-        if self.now_playing.id not in self.shuffled_list:
-            self.shuffled_list.append(self.now_playing.id)
+        # play() marks it as played
+        self.current_queue = self.shuffle_order.peek(len(self.queue), self.current_queue)
+        return True
 
-        counter = 0
+    async def process_autoplay(self) -> bool:
+        if not self.config.autoplay or self.current_queue != len(self.queue) - 1:
+            return False
 
-        while True:
-            if len(self.shuffled_list) >= len(self.queue) or counter >= 5:
-                self.shuffled_list = [self.now_playing.id]
+        await asyncio.wait([self.schedule_autoplay()])
 
-            index = random.randint(0, len(self.queue) - 1)
-            if self.queue[index].id not in self.shuffled_list or len(self.queue) <= 1:
-                self.current_queue = index
+        if self.autoplay_seed != self.queue[-1].id:
+            # the finished fill was for a previous last song
+            await asyncio.wait([self.schedule_autoplay()])
+
+        while self.autoplay_buffer:
+            info = self.autoplay_buffer.popleft()
+
+            if self.is_autoplay_candidate(info.id):
+                self.add_to_queue(info, requested=self.bot.user)
+                self.current_queue += 1
+                self.schedule_autoplay()
                 return True
 
-            counter += 1
+        log.warn(f"No autoplay song found after {self.queue[-1].title}")
+        return False
 
-    async def process_autoplay(self) -> bool:
-        if not self.config.autoplay or self.current_queue != len(self.queue) - 1:
-            return False
+    def schedule_autoplay(self) -> asyncio.Task:
+        if not self.autoplay_task or self.autoplay_task.done():
+            self.autoplay_task = self.bot.loop.create_task(self.fill_autoplay())
 
-        current_queue = self.now_playing
+        return self.autoplay_task
 
-        related_videos = await self.ytdl.get_related_videos(current_queue.id)
-        filtered_videos = []
+    async def fill_autoplay(self) -> None:
+        """
+        Resolves the songs autoplay will add after the last song ahead of time,
+        skipping the ones in queue or recently played to avoid loops.
+        """
 
-        for video in related_videos:
-            existing = any(
-                [queue for queue in self.queue if queue.id == video.id.videoId]
+        seed = self.queue[-1].id if self.queue else None
+
+        if seed != self.autoplay_seed:
+            # leftovers are related to the previous last song, so they still fit
+            self.autoplay_seed = seed
+            self.autoplay_buffer = deque(
+                info for info in self.autoplay_buffer if self.is_autoplay_candidate(info.id)
             )
-            if not existing:
-                filtered_videos.append(video)
 
-        video_id = filtered_videos[0].id.videoId
+        if not seed or len(self.autoplay_buffer) >= AUTOPLAY_BUFFER_SIZE:
+            return
 
-        info = await self.ytdl.extract_info(video_id)
-        info = self.ytdl.parse_info(info)
-        self.add_to_queue(info, requested=self.bot.user)
-        self.current_queue += 1
+        try:
+            related_videos = await self.ytdl.get_related_videos(seed)
+        except Exception as e:
+            log.warn(f"Fetching related videos failed: {e}")
+            return
 
-        return True
+        buffered = {info.id for info in self.autoplay_buffer}
+
+        for video in related_videos:
+            video_id = video.id.videoId
+
+            if len(self.autoplay_buffer) >= AUTOPLAY_BUFFER_SIZE:
+                break
+            if not video_id or video_id in buffered or not self.is_autoplay_candidate(video_id):
+                continue
+
+            try:
+                info = await self.ytdl.extract_video(video_id)
+            except Exception as e:
+                log.warn(f"Autoplay failed to load {video_id}: {e}")
+                continue
+
+            if info:
+                self.autoplay_buffer.append(info)
+                buffered.add(info.id)
+
+    def is_autoplay_candidate(self, video_id: str) -> bool:
+        return video_id not in self.history and not self.in_queue(video_id)
+
+    async def enqueue(
+        self, entries: AsyncIterator[Dict], *, requested: discord.User
+    ) -> Tuple[int, int]:
+        """
+        Adds flat youtube entries to the queue as they are produced and starts
+        playing after the first one. Returns the number of added and failed entries.
+        """
+
+        added = error = 0
+
+        async for entry in entries:
+            if not entry or entry.title == "[Deleted video]":
+                error += 1
+                continue
+
+            if not self.add_to_queue(QueueEntry.from_flat(entry), requested=requested):
+                continue
+
+            added += 1
+
+            if added == 1:
+                # a failed first song shouldn't stop the rest from being queued
+                try:
+                    await self.start_playing()
+                except YtdlError as e:
+                    log.warn(f"Starting playback failed: {e}")
+                    await self.ctx.send(embed=Embed(e))
+                except discord.ClientException:
+                    msg = "Error while playing the song."
+                    log.exception(msg)
+                    await self.ctx.send(embed=Embed(msg))
+
+        return added, error
 
     async def process_youtube(
-        self, ctx: commands.Context, keyword: str, *, ytdl_list: Optional[list] = None
-    ) -> Tuple[Union[Dict, List], discord.Embed]:
+        self, ctx: commands.Context, keyword: str
+    ) -> Tuple[Dict, discord.Embed]:
         loading_msg = await self.ctx.send(embed=Embed("Loading..."))
 
-        if ytdl_list is None:
-            ytdl_list = await self.ytdl.extract_info(keyword)
+        chunks = self.ytdl.extract_playlist(keyword)
+        ytdl_list = await chunks.__anext__()
 
         info = Dict()
         embed: discord.Embed
@@ -297,13 +826,16 @@ class Player:
         await self.bot.delete_message(loading_msg)
 
         if isinstance(ytdl_list, list):
-            info = []
-            for entry in ytdl_list:
-                if entry.title != "[Deleted video]":
-                    entry.url = f"https://www.youtube.com/watch?v={entry.id}"
-                    info.append(entry)
 
-            embed = Embed(f"Added {plural(len(ytdl_list), 'song', 'songs')} to queue.")
+            async def entries() -> AsyncIterator[Dict]:
+                for entry in ytdl_list:
+                    yield entry
+                async for chunk in chunks:
+                    for entry in chunk:
+                        yield entry
+
+            added, _ = await self.enqueue(entries(), requested=ctx.author)
+            embed = Embed(f"Added {plural(added, 'song', 'songs')} to queue.")
         elif ytdl_list:
             info = self.ytdl.parse_info(ytdl_list)
             embed = Embed(
@@ -316,42 +848,75 @@ class Player:
         return info, embed
 
     async def process_spotify(self, ctx: commands.Context, url: str) -> Tuple[Dict, discord.Embed]:
+        from .track_cache import track_cache
+
         result = self.spotify.parse_url(url)
 
         if not result:
-            return await self.ctx.send(
-                embed=Embed("Invalid spotify url."), delete_after=5
-            )
-
-        if result.type == "playlist":
-            error = 0
-
-            processing_msg = await self.ctx.send(
-                embed=Embed("Converting to youtube playlist. Please wait...")
-            )
-            playlist = await self.spotify.get_playlist(result.id)
-            ytdl_list = []
+            return Dict(), Embed("Invalid spotify url.")
 
-            for item in playlist:
-                name = item.track.name
-                artist = item.track.artists[0].name
+        if result.type in ("playlist", "album", "artist"):
+            message = "Converting to youtube playlist. Please wait..."
 
-                info = await self.ytdl.create({"default_search": "ytsearch1"}).extract_info(f"{artist} {name} lyrics")
+            processing_msg = await self.ctx.send(embed=Embed(message))
+            playlist = await self.spotify.get_tracks(result.type, result.id)
+            ytdl = self.ytdl.create({"default_search": "ytsearch1"})
+            semaphore = asyncio.Semaphore(SPOTIFY_CONCURRENCY)
+            cached = await track_cache.get_many([track.id for track in playlist])
+            resolved = {}
 
-                if len(info) == 0:
-                    error += 1
-                    continue
+            async def resolve(track: Dict) -> Dict:
+                if track.id in cached:
+                    return cached[track.id]
 
-                ytdl_list.append(info[0])
+                name = track.name
+                artist = track.artists[0].name
 
-            await self.bot.delete_message(processing_msg)
+                async with semaphore:
+                    info = await ytdl.search(f"{artist} {name} lyrics")
 
-            info, embed = await self.process_youtube(ctx, "", ytdl_list=ytdl_list)
+                if len(info) == 0:
+                    return Dict()
+
+                if track.id:
+                    resolved[track.id] = info[0]
+                return info[0]
+
+            async def entries() -> AsyncGenerator[Dict, None]:
+                # resolve concurrently but yield in playlist order,
+                # so the first song can play while the rest are converting
+                tasks = [asyncio.ensure_future(resolve(track)) for track in playlist]
+                last_edit = time()
+
+                try:
+                    for index, task in enumerate(tasks, start=1):
+                        yield await task
+
+                        if time() - last_edit >= 2 and index < len(tasks):
+                            last_edit = time()
+                            await processing_msg.edit(
+                                embed=Embed(f"{message} ({index}/{len(tasks)})")
+                            )
+                finally:
+                    # don't leave the remaining searches running if enqueueing stopped early
+                    for task in tasks:
+                        task.cancel()
+
+            generator = entries()
+
+            try:
+                added, error = await self.enqueue(generator, requested=ctx.author)
+            finally:
+                await generator.aclose()
+                await self.bot.delete_message(processing_msg)
+                await track_cache.set_many(resolved)
+
+            embed = Embed(f"Added {plural(added, 'song', 'songs')} to queue.")
 
             if error > 0:
-                embed = Embed(f"Added {plural(len(ytdl_list), 'song', 'songs')} to queue. {error} failed to load.")
+                embed = Embed(f"Added {plural(added, 'song', 'songs')} to queue. {error} failed to load.")
 
-            return info, embed
+            return Dict(), embed
 
         else:
             track = await self.spotify.get_track(result.id)
@@ -361,7 +926,7 @@ class Player:
         self, keyword: str, *, force_choice: Optional[int] = None
     ) -> Tuple[Dict, discord.Embed]:
         msg = await self.ctx.send(embed=Embed("Searching..."))
-        extracted = await self.ytdl.extract_info(keyword)
+        extracted = await self.ytdl.search(keyword)
         ytdl_choices = self.ytdl.parse_choices(extracted)
 
         await self.bot.delete_message(msg)
@@ -387,17 +952,59 @@ class Player:
 
         return info, embed
 
-    def add_to_queue(self, data: Union[List, Dict], *, requested: discord.User = None) -> None:
+    def in_queue(self, video_id: str) -> bool:
+        return self.queue_ids[video_id] > 0
+
+    def add_to_queue(
+        self,
+        data: Union[List[QueueEntry], QueueEntry],
+        *,
+        requested: discord.User = None,
+    ) -> int:
+        """Adds the songs to queue and returns how many were added."""
+
         if not isinstance(data, list):
             data = [data]
 
+        added = 0
+
         for info in data:
+            if self.config.noduplicates and self.in_queue(info.id):
+                continue
+
             info.requested = requested or self.ctx.author
             self.queue.append(info)
+            self.queue_ids[info.id] += 1
+            self.shuffle_order.add(len(self.queue) - 1)
+            self.track_expiration(info)
+            added += 1
+
+        if added and self.connection and self.connection.is_playing():
+            self.schedule_prefetch()
+
+        if added:
+            self.schedule_hydrate()
 
-    def update_config(self, key: str, value: Union[str, int]) -> Dict:
+        return added
+
+    def remove_from_queue(self, index: int) -> None:
+        video_id = self.queue.pop(index).id
+
+        self.queue_ids[video_id] -= 1
+        if self.queue_ids[video_id] <= 0:
+            del self.queue_ids[video_id]
+
+        self.shuffle_order.remove(index)
+
+    async def update_config(self, key: str, value: Union[str, int]) -> Dict:
         database = self.db
         database.config.music[key] = value
-        database.update().refresh()
+        await database.update()
         self.config = database.config.music
+
+        # the warmed up song may no longer be the upcoming one
+        self.clear_upcoming()
+        if self.connection and self.connection.is_playing():
+            self.schedule_prefetch()
+
         return self.config
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import discord
+from addict import Dict
+
+
+class QueueEntry:
+    """
+    A song in the player's queue.
+
+    Uses __slots__ instead of a Dict per song since guilds can queue
+    hundreds of them. Stubs from flat playlists, searches and caches only
+    have the light fields, the rest stays None until the song is resolved.
+    """
+
+    __slots__ = (
+        "id",
+        "title",
+        "url",
+        "duration",
+        "requested",
+        "stream",
+        "acodec",
+        "description",
+        "uploader",
+        "upload_date",
+        "view_count",
+        "thumbnail",
+    )
+
+    id: str
+    title: str
+    url: str
+    duration: Optional[int]
+    requested: discord.User
+    stream: Optional[str]
+    acodec: Optional[str]
+    description: Optional[str]
+    uploader: Optional[str]
+    upload_date: Optional[str]
+    view_count: Optional[str]
+    thumbnail: Optional[str]
+
+    def __init__(self, **fields: Any) -> None:
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_flat(cls, entry: Dict) -> QueueEntry:
+        """Creates a stub from a flat youtube_dl entry."""
+
+        return cls(
+            id=entry.id,
+            title=entry.title,
+            url=f"https://www.youtube.com/watch?v={entry.id}",
+            duration=entry.duration,
+            uploader=entry.uploader,
+        )
+
+    # fields filled by hydrate(), stream is left to the player
+    METADATA = (
+        "title",
+        "duration",
+        "description",
+        "uploader",
+        "upload_date",
+        "view_count",
+        "thumbnail",
+    )
+
+    @property
+    def is_resolved(self) -> bool:
+        return self.stream is not None
+
+    @property
+    def has_metadata(self) -> bool:
+        # view_count is only set by parse_info
+        return self.view_count is not None
+
+    def hydrate(self, info: QueueEntry) -> None:
+        for name in self.METADATA:
+            setattr(self, name, getattr(info, name))
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"<QueueEntry id={self.id!r} title={self.title!r}>"
@@ -0,0 +1,85 @@
+import random
+from typing import List, Optional
+
+
+class ShuffleOrder:
+    """
+    Random play order of queue indices where every song plays once per cycle.
+
+    Unplayed indices are kept in a list with their positions, so picking,
+    adding and discarding are O(1). The picked index stays at the end of
+    the list until it's played, so it can be peeked for prefetching.
+    """
+
+    def __init__(self) -> None:
+        self.pending: List[int] = []
+        self.positions: dict = {}
+        self.picked = False
+
+    def reset(self, size: int, *, exclude: Optional[int] = None) -> None:
+        self.pending = [index for index in range(size) if index != exclude]
+        self.positions = {index: position for position, index in enumerate(self.pending)}
+        self.picked = False
+
+    def _swap(self, a: int, b: int) -> None:
+        pending = self.pending
+        pending[a], pending[b] = pending[b], pending[a]
+        self.positions[pending[a]] = a
+        self.positions[pending[b]] = b
+
+    def add(self, index: int) -> None:
+        self.positions[index] = len(self.pending)
+        self.pending.append(index)
+
+        if self.picked:
+            # keep the picked index last
+            self._swap(len(self.pending) - 1, len(self.pending) - 2)
+
+    def _remove_at(self, position: int) -> None:
+        last = self.pending.pop()
+
+        if position < len(self.pending):
+            self.pending[position] = last
+            self.positions[last] = position
+
+    def discard(self, index: int) -> None:
+        """Marks the index as played in the current cycle."""
+
+        position = self.positions.pop(index, None)
+
+        if position is None:
+            return
+
+        if not self.picked:
+            self._remove_at(position)
+        elif position == len(self.pending) - 1:
+            self.pending.pop()
+            self.picked = False
+        else:
+            # take the picked index off the end while filling the hole
+            picked = self.pending.pop()
+            self._remove_at(position)
+            self.positions[picked] = len(self.pending)
+            self.pending.append(picked)
+
+    def remove(self, index: int) -> None:
+        """Drops an index removed from the queue and shifts the ones after it."""
+
+        self.discard(index)
+        self.pending = [i - 1 if i > index else i for i in self.pending]
+        self.positions = {i: position for position, i in enumerate(self.pending)}
+
+    def peek(self, size: int, current: int) -> int:
+        """Returns the index to play after current, picking one if needed."""
+
+        if not self.pending:
+            self.reset(size, exclude=current)
+
+            if not self.pending:
+                return current
+
+        if not self.picked:
+            self._swap(random.randrange(len(self.pending)), len(self.pending) - 1)
+            self.picked = True
+
+        return self.pending[-1]
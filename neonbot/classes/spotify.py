@@ -1,9 +1,12 @@
+import asyncio
 from time import time
+from typing import List
 from urllib.parse import urlparse
 
 from addict import Dict
 
 from .. import bot, env
+from ..helpers.constants import SPOTIFY_PAGE_CONCURRENCY
 from ..helpers.exceptions import ApiError
 
 spotify_credentials = Dict()
@@ -66,25 +69,75 @@ class Spotify:
         )
         return Dict(await res.json())
 
-    async def get_playlist(self, playlist_id: str) -> Dict:
+    async def get_pages(self, url: str, *, limit: int, params: dict = {}) -> List[Dict]:
+        """
+        Fetches the first page to know the total,
+        then fetches the remaining pages concurrently.
+        """
+
         token = await self.get_token()
-        playlist = []
+        semaphore = asyncio.Semaphore(SPOTIFY_PAGE_CONCURRENCY)
+
+        async def fetch(offset: int) -> Dict:
+            async with semaphore:
+                res = await self.session.get(
+                    url,
+                    headers={"Authorization": f"Bearer {token}"},
+                    params={**params, "offset": offset, "limit": limit},
+                )
+                data = Dict(await res.json())
+
+            if data.error:
+                raise ApiError(data.error.message)
 
-        limit = 100
-        offset = 0
+            return data
+
+        first_page = await fetch(0)
+        pages = await asyncio.gather(
+            *[fetch(offset) for offset in range(limit, first_page.total, limit)]
+        )
 
-        while True:
-            res = await self.session.get(
-                self.BASE_URL + "/playlists/" + playlist_id + '/tracks',
-                headers={"Authorization": f"Bearer {token}"},
-                params={"offset": offset, "limit": limit}
-            )
-            data = Dict(await res.json())
-            playlist += data['items']
+        items = []
+        for page in [first_page, *pages]:
+            items += page["items"]
 
-            if data.next is None:
-                break
+        return items
+
+    async def get_tracks(self, url_type: str, url_id: str) -> List[Dict]:
+        if url_type == "playlist":
+            return await self.get_playlist(url_id)
+        elif url_type == "album":
+            return await self.get_album(url_id)
+        elif url_type == "artist":
+            return await self.get_artist_top_tracks(url_id)
+
+        return []
+
+    async def get_playlist(self, playlist_id: str) -> List[Dict]:
+        items = await self.get_pages(
+            self.BASE_URL + "/playlists/" + playlist_id + "/tracks",
+            limit=100,
+            params={"fields": "total,items(track(id,name,artists(name)))"},
+        )
+        # local files and removed tracks have no track object
+        return [item.track for item in items if item.track]
+
+    async def get_album(self, album_id: str) -> List[Dict]:
+        return await self.get_pages(
+            self.BASE_URL + "/albums/" + album_id + "/tracks", limit=50
+        )
+
+    async def get_artist_top_tracks(self, artist_id: str) -> List[Dict]:
+        token = await self.get_token()
+
+        res = await self.session.get(
+            self.BASE_URL + "/artists/" + artist_id + "/top-tracks",
+            headers={"Authorization": f"Bearer {token}"},
+            params={"market": "US"},
+        )
+        data = Dict(await res.json())
 
-            offset += limit
+        if data.error:
+            raise ApiError(data.error.message)
 
-        return playlist
+        return data.tracks
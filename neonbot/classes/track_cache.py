@@ -0,0 +1,103 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Optional
+
+from addict import Dict
+
+from .. import bot
+from ..helpers.constants import TRACK_CACHE_SIZE, TRACK_CACHE_TTL
+
+
+class TrackCache:
+    """
+    Persistent cache of spotify track ids resolved to youtube videos.
+
+    Entries expire after the ttl and the oldest ones are evicted once
+    the cache is over max_size. All sqlite access runs on one worker thread.
+    """
+
+    def __init__(self, file: str, *, ttl: int, max_size: int) -> None:
+        self.file = file
+        self.ttl = ttl
+        self.max_size = max_size
+        self.thread_pool = ThreadPoolExecutor(max_workers=1)
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.file)
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tracks (
+                    track_id TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    title TEXT,
+                    duration INTEGER,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS tracks_created_at ON tracks (created_at)"
+            )
+        return self.connection
+
+    def _get_many(self, track_ids: list) -> dict:
+        connection = self._connect()
+        expiration = time() - self.ttl
+        rows = []
+
+        # stay below sqlite's limit of host parameters per query
+        for i in range(0, len(track_ids), 500):
+            chunk = track_ids[i : i + 500]
+            rows += connection.execute(
+                "SELECT track_id, video_id, title, duration FROM tracks "
+                f"WHERE created_at > ? AND track_id IN ({','.join('?' * len(chunk))})",
+                (expiration, *chunk),
+            ).fetchall()
+
+        return {
+            track_id: Dict(
+                _type="url",
+                ie_key="Youtube",
+                id=video_id,
+                url=video_id,
+                title=title,
+                duration=duration,
+            )
+            for track_id, video_id, title, duration in rows
+        }
+
+    def _set_many(self, entries: dict) -> None:
+        connection = self._connect()
+        now = time()
+
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?)",
+                [
+                    (track_id, entry.id, entry.title, entry.duration, now)
+                    for track_id, entry in entries.items()
+                ],
+            )
+            connection.execute(
+                "DELETE FROM tracks WHERE created_at <= ?", (now - self.ttl,)
+            )
+            connection.execute(
+                "DELETE FROM tracks WHERE track_id IN ("
+                "SELECT track_id FROM tracks ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+
+    async def get_many(self, track_ids: list) -> dict:
+        return await bot.loop.run_in_executor(self.thread_pool, self._get_many, track_ids)
+
+    async def set_many(self, entries: dict) -> None:
+        if entries:
+            await bot.loop.run_in_executor(self.thread_pool, self._set_many, entries)
+
+
+track_cache = TrackCache(
+    "./tmp/tracks.db", ttl=TRACK_CACHE_TTL, max_size=TRACK_CACHE_SIZE
+)
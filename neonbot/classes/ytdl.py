@@ -1,48 +1,264 @@
 from __future__ import annotations
 
+import asyncio
 import functools
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, List, Union
+from time import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Hashable,
+    List,
+    Optional,
+    Union,
+    cast,
+    overload,
+)
 from urllib.parse import parse_qs, urlparse
 
-import youtube_dl
 from addict import Dict
+from ytdl_worker import get_params_key, run_youtube_dl
 
 from .. import bot, env
+from ..helpers.constants import (
+    RELATED_CACHE_SIZE,
+    RELATED_CACHE_TTL,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+)
 from ..helpers.date import date
 from ..helpers.exceptions import YtdlError
+from .queue_entry import QueueEntry
+
+
+class YtdlPool:
+    """
+    Process-wide worker pool for youtube_dl extraction.
+
+    Pending jobs are queued per key (guild) and dispatched round-robin,
+    so one guild loading a big playlist can't starve the others.
+
+    With use_processes, jobs run in worker processes to keep
+    the CPU-heavy parsing off the GIL shared with the voice threads.
+    """
+
+    def __init__(self, max_workers: int, *, use_processes: bool = False) -> None:
+        self.max_workers = max_workers
+        self.executor = self.create_executor(max_workers, use_processes)
+        self.queues: OrderedDict = OrderedDict()
+        self.running = 0
+        self.processed = 0
+
+    @staticmethod
+    def create_executor(max_workers: int, use_processes: bool) -> Executor:
+        if use_processes:
+            # forking would copy the bot's sockets, threads and locks into the
+            # workers, so they start fresh and only import ytdl_worker
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                multiprocessing.set_forkserver_preload(["ytdl_worker"])
+                method = "forkserver"
+            else:
+                method = "spawn"
+
+            return ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context(method)
+            )
+
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    async def run(self, key: Any, func: Callable) -> Any:
+        future = bot.loop.create_future()
+        self.queues.setdefault(key, deque()).append((func, future))
+        self._dispatch()
+        return await future
+
+    def _dispatch(self) -> None:
+        while self.running < self.max_workers and self.queues:
+            key, queue = next(iter(self.queues.items()))
+            func, future = queue.popleft()
+
+            if queue:
+                self.queues.move_to_end(key)
+            else:
+                del self.queues[key]
+
+            if future.cancelled():
+                continue
+
+            self.running += 1
+            task = bot.loop.run_in_executor(self.executor, func)
+            task.add_done_callback(functools.partial(self._done, future))
+
+    def _done(self, future: asyncio.Future, task: asyncio.Future) -> None:
+        self.running -= 1
+        self.processed += 1
+
+        if not future.cancelled():
+            exception = task.exception()
+
+            if exception:
+                future.set_exception(exception)
+            else:
+                future.set_result(task.result())
+
+        self._dispatch()
+
+    @property
+    def stats(self) -> Dict:
+        return Dict(
+            workers=self.max_workers,
+            running=self.running,
+            pending=sum(len(queue) for queue in self.queues.values()),
+            guilds=len(self.queues),
+            processed=self.processed,
+        )
+
+
+ytdl_pool = YtdlPool(
+    env.int("YTDL_WORKERS", 3), use_processes=env.bool("YTDL_PROCESS_POOL", False)
+)
+
+
+class SearchCache:
+    """
+    LRU cache with a ttl for search results.
+
+    Identical searches that arrive while one is still extracting
+    wait for that extraction instead of starting their own.
+    Only results that pass cache_if are kept.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int,
+        ttl: int,
+        cache_if: Callable[[Any], bool] = lambda result: result and "entries" in result,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_if = cache_if
+        self.entries: OrderedDict = OrderedDict()
+        self.pending: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: Hashable, func: Callable[[], Awaitable]) -> Any:
+        entry = self.entries.get(key)
+
+        if entry and time() - entry[0] < self.ttl:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+        if key in self.pending:
+            self.hits += 1
+            return await asyncio.shield(self.pending[key])
+
+        self.misses += 1
+        task = self.pending[key] = asyncio.ensure_future(func())
+        task.add_done_callback(functools.partial(self._done, key))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future) -> None:
+        self.pending.pop(key, None)
+
+        if task.cancelled() or task.exception():
+            return
+
+        result = task.result()
+
+        # by default only flat search results, never resolved stream urls
+        if self.cache_if(result):
+            self.entries[key] = (time(), result)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    @property
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return Dict(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self.entries),
+            hit_rate=self.hits / total if total else 0,
+        )
+
+
+search_cache = SearchCache(max_size=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+related_cache = SearchCache(
+    max_size=RELATED_CACHE_SIZE, ttl=RELATED_CACHE_TTL, cache_if=bool
+)
 
 
 class Ytdl:
-    def __init__(self, extra_params: dict = {}) -> None:
-        self.thread_pool = ThreadPoolExecutor(max_workers=3)
-        self.loop = bot.loop
-        self.ytdl = youtube_dl.YoutubeDL(
-            {
-                "default_search": "ytsearch5",
-                "format": "95/bestaudio",
-                "quiet": True,
-                "nocheckcertificate": True,
-                "ignoreerrors": True,
-                "extract_flat": "in_playlist",
-                "geo_bypass": True,
-                **extra_params,
-            }
+    def __init__(self, extra_params: dict = {}, *, key: Any = None) -> None:
+        self.extra_params = extra_params
+        self.key = key
+
+    async def _extract_info(self, *args: Any, **kwargs: Any) -> Any:
+        return await ytdl_pool.run(
+            self.key,
+            functools.partial(
+                run_youtube_dl, self.extra_params, "extract_info", *args, **kwargs
+            ),
         )
 
     async def extract_info(self, *args: Any, **kwargs: Any) -> Union[list, Dict]:
-        result = await self.loop.run_in_executor(
-            self.thread_pool,
-            functools.partial(self.ytdl.extract_info, *args, download=False, **kwargs),
+        info = Dict(await self._extract_info(*args, **kwargs))
+        return info.get("entries", info)
+
+    async def search(self, keyword: str) -> Union[list, Dict]:
+        """Same as extract_info but goes through the shared search cache."""
+
+        key = (" ".join(keyword.lower().split()), get_params_key(self.extra_params))
+        result = await search_cache.get(
+            key, functools.partial(self._extract_info, keyword)
         )
+        # build a new Dict every time since callers modify the entries
         info = Dict(result)
         return info.get("entries", info)
 
+    async def extract_playlist(
+        self, url: str, *, chunk_size: int = 10
+    ) -> AsyncIterator[Union[list, Dict]]:
+        """
+        Extracts a playlist in growing chunks so the first entries can be
+        queued before the whole playlist is loaded. A single video is
+        yielded as is.
+        """
+
+        start = 1
+
+        while True:
+            end = start + chunk_size - 1
+            info = await self.create(
+                {"playliststart": start, "playlistend": end}
+            ).extract_info(url)
+
+            yield info
+
+            if not isinstance(info, list) or len(info) < chunk_size:
+                return
+
+            start = end + 1
+            chunk_size *= 2
+
     async def process_entry(self, info: Dict) -> Dict:
-        result = await self.loop.run_in_executor(
-            self.thread_pool,
-            functools.partial(self.ytdl.process_ie_result, info, download=False),
+        # requested holds a discord.User which can't be sent to a worker process
+        entry = {key: value for key, value in info.items() if key != "requested"}
+        result = await ytdl_pool.run(
+            self.key,
+            functools.partial(
+                run_youtube_dl, self.extra_params, "process_ie_result", entry
+            ),
         )
         if not result:
             raise YtdlError(
@@ -61,7 +277,22 @@ class Ytdl:
             for entry in info
         ]
 
-    def parse_info(self, info: Dict) -> Union[List[Dict], Dict]:
+    async def extract_video(self, video_id: str) -> Optional[QueueEntry]:
+        """Extracts a single video, None if it's unavailable."""
+
+        return self.parse_info(cast(Dict, await self.extract_info(video_id)))
+
+    @overload
+    def parse_info(self, info: list) -> List[QueueEntry]:
+        ...
+
+    @overload
+    def parse_info(self, info: Dict) -> Optional[QueueEntry]:
+        ...
+
+    def parse_info(
+        self, info: Union[list, Dict]
+    ) -> Union[List[QueueEntry], Optional[QueueEntry]]:
         def parse_description(description: str) -> str:
             description_arr = description.split("\n")[:15]
             while len("\n".join(description_arr)) > 1000:
@@ -70,8 +301,8 @@ class Ytdl:
                 description_arr.append("...")
             return "\n".join(description_arr)
 
-        def parse_entry(entry: Dict) -> Dict:
-            return Dict(
+        def parse_entry(entry: Dict) -> QueueEntry:
+            return QueueEntry(
                 id=entry.id,
                 title=entry.title,
                 description=parse_description(entry.description),
@@ -79,6 +310,7 @@ class Ytdl:
                 duration=entry.duration,
                 thumbnail=entry.thumbnail,
                 stream=entry.url,
+                acodec=entry.acodec,
                 url=entry.webpage_url,
                 view_count=f"{entry.view_count:,}",
                 upload_date=datetime.strptime(entry.upload_date, "%Y%m%d").strftime(
@@ -91,23 +323,31 @@ class Ytdl:
 
         return parse_entry(info) if info else None
 
-    @classmethod
-    def create(cls, extra_params: dict) -> Ytdl:
-        return cls(extra_params)
-
-    async def get_related_videos(self, video_id: str) -> Dict:
-        res = await bot.session.get(
-            "https://www.googleapis.com/youtube/v3/search",
-            params={
-                "part": "snippet",
-                "relatedToVideoId": video_id,
-                "type": "video",
-                "key": env.str("GOOGLE_API"),
-            },
-        )
-        json = await res.json()
-        return Dict(json)["items"]
+    def create(self, extra_params: dict) -> Ytdl:
+        return Ytdl({**self.extra_params, **extra_params}, key=self.key)
 
-    def is_link_expired(self, url: str) -> bool:
+    async def get_related_videos(self, video_id: str) -> List[Dict]:
+        """Related videos through the shared cache, to save api quota."""
+
+        async def fetch() -> List[Dict]:
+            res = await bot.session.get(
+                "https://www.googleapis.com/youtube/v3/search",
+                params={
+                    "part": "snippet",
+                    "relatedToVideoId": video_id,
+                    "type": "video",
+                    "key": env.str("GOOGLE_API"),
+                },
+            )
+            json = await res.json()
+            return Dict(json).get("items") or []
+
+        return await related_cache.get(video_id, fetch)
+
+    def get_link_expiration(self, url: str) -> Optional[int]:
         params = Dict(parse_qs(urlparse(url).query))
-        return date().timestamp() > int(params.expire[0]) - 1800 if params else False
+        return int(params.expire[0]) if params.expire else None
+
+    def is_link_expired(self, url: str) -> bool:
+        expiration = self.get_link_expiration(url)
+        return date().timestamp() > expiration - 1800 if expiration else False
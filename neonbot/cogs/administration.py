@@ -47,7 +47,7 @@ class Administration(commands.Cog):
             "ctx": ctx,
             "players": bot.music,
             "player": bot.music[ctx.guild.id],
-            "config": self.db.get_guild(ctx.guild.id).config,
+            "config": (await self.db.get_guild(ctx.guild.id)).config,
             "rooms": bot.game,
             "room": bot.game[ctx.guild.id],
             "Embed": Embed,
@@ -125,7 +125,7 @@ class Administration(commands.Cog):
         If member is specified, it will delete message of that member.
         """
 
-        config = self.db.get_guild(ctx.guild.id).config
+        config = (await self.db.get_guild(ctx.guild.id)).config
 
         if config.deleteoncmd:
             await self.bot.delete_message(ctx.message)
@@ -144,10 +144,10 @@ class Administration(commands.Cog):
     async def prefix(self, ctx: commands.Context, prefix: str) -> None:
         """Sets the prefix of the current server. *ADMINISTRATOR"""
 
-        database = self.db.get_guild(ctx.guild.id)
+        database = await self.db.get_guild(ctx.guild.id)
         config = database.config
         config.prefix = prefix
-        config = database.update().config
+        config = (await database.update()).config
         await ctx.send(embed=Embed(f"Prefix is now set to {config.prefix}."))
 
     @commands.command()
@@ -162,10 +162,10 @@ class Administration(commands.Cog):
         if status is False:
             return
 
-        database = self.db.get_settings()
+        database = await self.db.get_settings()
         settings = database.settings
         settings.status = status
-        settings = database.update().settings
+        settings = (await database.update()).settings
 
         await bot.change_presence(status=discord.Status[status])
         await ctx.send(embed=Embed(f"Status is now set to {settings.status}."))
@@ -184,11 +184,11 @@ class Administration(commands.Cog):
         if presence_type is False:
             return
 
-        database = self.db.get_settings()
+        database = await self.db.get_settings()
         settings = database.settings
         settings.game.type = presence_type
         settings.game.name = name
-        settings = database.update().settings
+        settings = (await database.update()).settings
 
         await bot.change_presence(
             activity=discord.Activity(
@@ -210,17 +210,14 @@ class Administration(commands.Cog):
         You must be the owner of the alias to update it.
         """
 
-        database = self.db.get_guild(ctx.guild.id)
-        aliases = database.config.aliases
-        ids = [i for i, x in enumerate(aliases) if x.name == name]
-        if any(ids):
-            if int(aliases[ids[0]].owner) != ctx.author.id and await bot.is_owner(
-                ctx.author
-            ):
+        database = await self.db.get_guild(ctx.guild.id)
+        alias = database.aliases.get(name)
+        if alias:
+            if int(alias.owner) != ctx.author.id and await bot.is_owner(ctx.author):
                 return await ctx.send(
                     embed=Embed("You are not the owner of the alias."), delete_after=5
                 )
-            aliases[ids[0]].cmd = (
+            alias.cmd = (
                 command.replace(ctx.prefix, "{0}", 1)
                 if command.startswith(ctx.prefix)
                 else command
@@ -229,7 +226,7 @@ class Administration(commands.Cog):
             database.config.aliases.append(
                 {"name": name, "cmd": command, "owner": ctx.author.id}
             )
-        database.update()
+        await database.update()
         await ctx.send(
             embed=Embed(f"Message with exactly `{name}` will now execute `{command}`"),
             delete_after=10,
@@ -244,19 +241,16 @@ class Administration(commands.Cog):
         You must be the owner of the alias to delete it.
         """
 
-        database = self.db.get_guild(ctx.guild.id)
-        aliases = database.config.aliases
-        ids = [i for i, x in enumerate(aliases) if x.name == name]
-        if not ids:
+        database = await self.db.get_guild(ctx.guild.id)
+        alias = database.aliases.get(name)
+        if not alias:
             return await ctx.send(embed=Embed("Alias doesn't exists."), delete_after=5)
-        if int(aliases[ids[0]].owner) != ctx.author.id and await bot.is_owner(
-            ctx.author
-        ):
+        if int(alias.owner) != ctx.author.id and await bot.is_owner(ctx.author):
             return await ctx.send(
                 embed=Embed("You are not the owner of the alias."), delete_after=5
             )
-        del aliases[ids[0]]
-        database.update()
+        database.config.aliases.remove(alias)
+        await database.update()
         await ctx.send(embed=Embed(f"Alias`{name}` has been deleted."), delete_after=5)
 
     @commands.command()
@@ -269,10 +263,10 @@ class Administration(commands.Cog):
         If enabled, it will delete the command message of the user.
         """
 
-        database = self.db.get_guild(ctx.guild.id)
+        database = await self.db.get_guild(ctx.guild.id)
         config = database.config
         config.deleteoncmd = not config.deleteoncmd
-        config = database.update().config
+        config = (await database.update()).config
         await ctx.send(
             embed=Embed(
                 f"Delete on command is now set to {'enabled' if config.deleteoncmd else 'disabled'}."
@@ -291,12 +285,12 @@ class Administration(commands.Cog):
         Note: The message will be sent to the current channel this command last executed.
         """
 
-        database = self.db.get_guild(ctx.guild.id)
+        database = await self.db.get_guild(ctx.guild.id)
         config = database.config
         config.channel.voicetts = (
             ctx.channel.id if config.channel.voicetts != ctx.channel.id else None
         )
-        config = database.update().config
+        config = (await database.update()).config
 
         if config.channel.voicetts:
             await ctx.send(embed=Embed("Voice TTS is now set to this channel."))
@@ -325,12 +319,12 @@ class Administration(commands.Cog):
 
         Note: The message will be sent to the current channel this command last executed.
         """
-        database = self.db.get_guild(ctx.guild.id)
+        database = await self.db.get_guild(ctx.guild.id)
         config = database.config
         config.channel.log = (
             ctx.channel.id if config.channel.log != ctx.channel.id else None
         )
-        config = database.update().config
+        config = (await database.update()).config
 
         if config.channel.log:
             await ctx.send(embed=Embed("Logger Presence is now set to this channel."))
@@ -347,12 +341,12 @@ class Administration(commands.Cog):
 
         Note: The message will be sent to the current channel this command last executed.
         """
-        database = self.db.get_guild(ctx.guild.id)
+        database = await self.db.get_guild(ctx.guild.id)
         config = database.config
         config.channel.msgdelete = (
             ctx.channel.id if config.channel.msgdelete != ctx.channel.id else None
         )
-        config = database.update().config
+        config = (await database.update()).config
 
         if config.channel.log:
             await ctx.send(embed=Embed("Logger Message is now set to this channel."))
@@ -1,7 +1,7 @@
 import logging
 import traceback
 from datetime import datetime
-from typing import List, Optional, Tuple, Union, cast
+from typing import Optional, Tuple, Union, cast
 
 import discord
 from addict import Dict
@@ -19,14 +19,39 @@ from .utility import chatbot
 log = cast(Log, logging.getLogger(__name__))
 
 
+def is_mentioned(message: discord.Message) -> bool:
+    return message.content.replace("<@!", "<@", 1).startswith(bot.user.mention)
+
+
+def can_skip(message: discord.Message) -> bool:
+    """
+    Checks from the cached guild config if the message can't be a command,
+    an alias or a mention so it can be ignored without building a context.
+    """
+
+    if not message.guild:
+        return False
+
+    database = bot.db.get_cached_guild(message.guild.id)
+
+    if database is None or not database.config.prefix:
+        return False
+
+    return not (
+        message.content.startswith(database.config.prefix)
+        or message.content in database.aliases
+        or is_mentioned(message)
+    )
+
+
 async def get_ctx(message: discord.Message) -> Tuple[bool, commands.Context]:
-    aliases: List[Dict] = []
+    alias: Optional[Dict] = None
     if message.guild:
-        config = bot.db.get_guild(message.guild.id).config
-        aliases = [x for x in config.aliases if x.name == message.content]
-        if any(aliases):
-            message.content = aliases[0].cmd.format(config.prefix)
-    return any(aliases), await bot.get_context(message)
+        database = await bot.db.get_guild(message.guild.id)
+        alias = database.aliases and database.aliases.get(message.content)
+        if alias:
+            message.content = alias.cmd.format(database.config.prefix)
+    return bool(alias), await bot.get_context(message)
 
 
 class Event(commands.Cog):
@@ -45,13 +70,14 @@ class Event(commands.Cog):
     @staticmethod
     @bot.event
     async def on_ready() -> None:
+        await bot.db.process_database(bot.guilds)
         log.info("Ready!\n")
         await bot.send_restart_message()
 
     @staticmethod
     @bot.event
     async def on_resumed() -> None:
-        presence = bot.get_presence()
+        presence = await bot.get_presence()
         await bot.change_presence(status=presence[0], activity=presence[1])
         # log.info("Resumed!\n")
 
@@ -61,9 +87,13 @@ class Event(commands.Cog):
         if message.author.id == bot.user.id:
             return
 
+        if can_skip(message):
+            bot.messages_skipped += 1
+            return
+
         is_alias, ctx = await get_ctx(message)
 
-        if message.content.replace("<@!", "<@", 1).startswith(bot.user.mention):
+        if is_mentioned(message):
             log.cmd(ctx, message.content)
             return await chatbot(message)
         elif ctx.channel.type.name == "private":
@@ -93,7 +123,7 @@ class Event(commands.Cog):
         if message.author.id == bot.user.id:
             return
 
-        config = bot.db.get_guild(message.guild.id).config
+        config = (await bot.db.get_guild(message.guild.id)).config
         log_channel = bot.get_channel(int(config.channel.msgdelete or -1))
 
         if log_channel:
@@ -110,7 +140,7 @@ class Event(commands.Cog):
         if member.bot:
             return
 
-        config = bot.db.get_guild(member.guild.id).config
+        config = (await bot.db.get_guild(member.guild.id)).config
         player = bot.music[member.guild.id]
         voice_channel = after.channel or before.channel
 
@@ -164,7 +194,7 @@ class Event(commands.Cog):
         if before.bot:
             return
 
-        config = bot.db.get_guild(before.guild.id).config
+        config = (await bot.db.get_guild(before.guild.id)).config
         log_channel = bot.get_channel(int(config.channel.log or -1))
 
         embed = Embed()
@@ -226,7 +256,7 @@ class Event(commands.Cog):
     @staticmethod
     @bot.event
     async def on_member_join(member: discord.Member) -> None:
-        config = bot.db.get_guild(member.guild.id).config
+        config = (await bot.db.get_guild(member.guild.id)).config
         channel = bot.get_channel(int(config.channel.log))
 
         msg = f"**{member.name}** joined the server."
@@ -240,7 +270,7 @@ class Event(commands.Cog):
     @staticmethod
     @bot.event
     async def on_member_remove(member: discord.Member) -> None:
-        config = bot.db.get_guild(member.guild.id).config
+        config = (await bot.db.get_guild(member.guild.id)).config
         channel = bot.get_channel(int(config.channel.log))
 
         msg = f"**{member.name}** left the server."
@@ -261,7 +291,7 @@ class Event(commands.Cog):
         if ctx.channel.type.name == "private":
             return
 
-        config = bot.db.get_guild(ctx.guild.id).config
+        config = (await bot.db.get_guild(ctx.guild.id)).config
 
         if ctx.command.name not in IGNORED_DELETEONCMD and config.deleteoncmd:
             await bot.delete_message(ctx.message)
@@ -12,10 +12,14 @@ from ..helpers.log import Log
 log = cast(Log, logging.getLogger(__name__))
 
 
-def get_channel(ctx: commands.Context) -> Dict:
+async def get_channel(ctx: commands.Context) -> Dict:
     rooms = bot.game
     if ctx.channel.id not in rooms.keys():
-        rooms[ctx.channel.id] = Dict(pokemon=Pokemon(ctx), connect4=Connect4(ctx))
+        database = await bot.db.get_guild(ctx.guild.id)
+        if ctx.channel.id not in rooms.keys():
+            rooms[ctx.channel.id] = Dict(
+                pokemon=Pokemon(ctx), connect4=Connect4(ctx, database)
+            )
 
     return rooms[ctx.channel.id]
 
@@ -26,7 +30,7 @@ class Game(commands.Cog):
     async def pokemon(self, ctx: commands.Context, *, command: str) -> None:
         """Starts, stops, or shows the scoreboard of the pokemon game."""
 
-        pokemon = get_channel(ctx).pokemon
+        pokemon = (await get_channel(ctx)).pokemon
 
         if command == "start":
             if pokemon.status == 1:
@@ -53,7 +57,7 @@ class Game(commands.Cog):
     async def connect4(self, ctx: commands.Context) -> None:
         """Starts connect4 game and waits for the players if players are insufficient."""
 
-        connect4 = get_channel(ctx).connect4
+        connect4 = (await get_channel(ctx)).connect4
         if connect4.players == 2:
             await ctx.send(
                 embed=Embed("Connect4 game is already running"), delete_after=5
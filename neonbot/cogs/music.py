@@ -9,17 +9,19 @@ from .. import bot
 from ..classes import Embed, PaginationEmbed, Player
 from ..classes.converters import Required
 from ..helpers.constants import SPOTIFY_REGEX, YOUTUBE_REGEX
-from ..helpers.date import format_seconds
+from ..helpers.date import format_seconds, parse_seconds
 from ..helpers.log import Log
 from ..helpers.utils import plural
 
 log = cast(Log, logging.getLogger(__name__))
 
 
-def get_player(ctx: commands.Context) -> Player:
+async def get_player(ctx: commands.Context) -> Player:
     players = ctx.bot.music
     if ctx.guild.id not in players.keys():
-        players[ctx.guild.id] = Player(ctx)
+        database = await ctx.bot.db.get_guild(ctx.guild.id)
+        if ctx.guild.id not in players.keys():
+            players[ctx.guild.id] = Player(ctx, database)
 
     return players[ctx.guild.id]
 
@@ -35,7 +37,7 @@ async def in_voice(ctx: commands.Context) -> bool:
 
 
 async def has_player(ctx: commands.Context) -> bool:
-    player = get_player(ctx)
+    player = await get_player(ctx)
 
     if not player.connection and ctx.invoked_with != "help":
         await ctx.send(embed=Embed("No active player."), delete_after=5)
@@ -54,7 +56,7 @@ class Music(commands.Cog):
     async def play(self, ctx: commands.Context, *, keyword: str = None) -> None:
         """Searches the url or the keyword and add it to queue."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
         player.ctx = ctx
 
         embed = info = loading_msg = None
@@ -77,18 +79,14 @@ class Music(commands.Cog):
                 if not info:
                     return
 
-        if info:
-            player.add_to_queue(info, requested=ctx.author)
+        if info and not player.add_to_queue(info, requested=ctx.author):
+            embed = Embed("Song is already in the queue.")
         if loading_msg:
             await self.bot.delete_message(loading_msg)
         if embed:
             await ctx.send(embed=embed, delete_after=5)
 
-        if any(player.queue) and not ctx.voice_client:
-            player.connection = await ctx.author.voice.channel.connect()
-            log.cmd(ctx, f"Connected to {ctx.author.voice.channel}.")
-        if player.connection and not player.connection.is_playing():
-            await player.play()
+        await player.start_playing()
 
     @commands.command()
     @commands.guild_only()
@@ -97,7 +95,7 @@ class Music(commands.Cog):
     async def pause(self, ctx: commands.Context) -> None:
         """Pauses the current player."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
 
         if player.connection.is_paused():
             return
@@ -116,7 +114,7 @@ class Music(commands.Cog):
     async def resume(self, ctx: commands.Context) -> None:
         """Resumes the current player."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
 
         if player.connection.is_playing():
             return
@@ -136,9 +134,35 @@ class Music(commands.Cog):
     async def skip(self, ctx: commands.Context) -> None:
         """Skips the current song."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
         player.connection.stop()
 
+    @commands.command(usage="<[hh:]mm:ss>")
+    @commands.guild_only()
+    @commands.check(has_player)
+    @commands.check(in_voice)
+    async def seek(self, ctx: commands.Context, time: str) -> None:
+        """Seeks the current song to the time specified."""
+
+        player = await get_player(ctx)
+        now_playing = player.now_playing
+        seconds = parse_seconds(time)
+
+        if not now_playing:
+            return await ctx.send(embed=Embed("No song playing."), delete_after=5)
+        elif seconds is None:
+            return await ctx.send(embed=Embed("Invalid time."), delete_after=5)
+        elif now_playing.duration and seconds >= now_playing.duration:
+            return await ctx.send(
+                embed=Embed("Time exceeds the song's duration."), delete_after=5
+            )
+
+        await player.seek(seconds)
+
+        msg = f"Seeked to {format_seconds(seconds)}."
+        log.cmd(ctx, msg)
+        await ctx.send(embed=Embed(msg), delete_after=5)
+
     @commands.command()
     @commands.guild_only()
     @commands.check(has_player)
@@ -146,7 +170,7 @@ class Music(commands.Cog):
     async def stop(self, ctx: commands.Context) -> None:
         """Stops the current player and resets the track number to 1."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
         await player.next(stop=True)
 
         player.current_queue = 0
@@ -162,7 +186,7 @@ class Music(commands.Cog):
     async def reset(self, ctx: commands.Context) -> None:
         """Resets the current player and disconnect to voice channel."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
         await player.reset()
 
         msg = "Player reset."
@@ -177,7 +201,7 @@ class Music(commands.Cog):
         """Remove the song with the index specified."""
 
         index -= 1
-        player = get_player(ctx)
+        player = await get_player(ctx)
 
         try:
             queue = player.queue[index]
@@ -194,7 +218,8 @@ class Music(commands.Cog):
 
         await ctx.send(embed=embed, delete_after=5)
 
-        del player.queue[index]
+        player.clear_upcoming()
+        player.remove_from_queue(index)
 
         if index < player.current_queue:
             player.current_queue -= 1
@@ -203,6 +228,10 @@ class Music(commands.Cog):
                 await player.next(stop=True)
             else:
                 await player.next(index=player.current_queue)
+            return
+
+        if player.connection.is_playing():
+            player.schedule_prefetch()
 
     @commands.command(aliases=["vol"], usage="<1 - 100>")
     @commands.guild_only()
@@ -211,7 +240,7 @@ class Music(commands.Cog):
     async def volume(self, ctx: commands.Context, volume: Optional[int] = None) -> None:
         """Sets or gets player's volume."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
 
         if volume is None:
             return await ctx.send(
@@ -223,10 +252,39 @@ class Music(commands.Cog):
                 embed=Embed("Volume must be 1 - 100."), delete_after=5
             )
 
-        player.connection.source.volume = volume / 100
-        player.update_config("volume", volume)
+        await player.set_volume(volume)
+
         await ctx.send(embed=Embed(f"Volume changed to {volume}%"), delete_after=5)
 
+    @commands.command(usage="<0 - 10>")
+    @commands.guild_only()
+    @commands.check(has_player)
+    @commands.check(in_voice)
+    async def crossfade(
+        self, ctx: commands.Context, seconds: Optional[int] = None
+    ) -> None:
+        """Sets or gets the seconds songs fade into each other."""
+
+        player = await get_player(ctx)
+
+        if seconds is None:
+            return await ctx.send(
+                embed=Embed(f"Crossfade is set to {player.config.crossfade or 0}s."),
+                delete_after=5,
+            )
+        elif seconds < 0 or seconds > 10:
+            return await ctx.send(
+                embed=Embed("Crossfade must be 0 - 10."), delete_after=5
+            )
+
+        if player.source:
+            player.source.crossfade = seconds
+
+        await player.update_config("crossfade", seconds)
+        await ctx.send(
+            embed=Embed(f"Crossfade changed to {seconds}s."), delete_after=5
+        )
+
     @commands.command(usage="<off | single | all>")
     @commands.guild_only()
     @commands.check(has_player)
@@ -238,7 +296,7 @@ class Music(commands.Cog):
     ) -> None:
         """Sets or gets player's repeat mode."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
 
         if mode is False:
             return
@@ -247,7 +305,7 @@ class Music(commands.Cog):
                 embed=Embed(f"Repeat is set to {player.config.repeat}."), delete_after=5
             )
 
-        player.update_config("repeat", mode)
+        await player.update_config("repeat", mode)
         await ctx.send(embed=Embed(f"Repeat changed to {mode}."), delete_after=5)
 
     @commands.command()
@@ -257,8 +315,8 @@ class Music(commands.Cog):
     async def autoplay(self, ctx: commands.Context) -> None:
         """Enables/disables player's autoplay mode."""
 
-        player = get_player(ctx)
-        config = player.update_config("autoplay", not player.config.autoplay)
+        player = await get_player(ctx)
+        config = await player.update_config("autoplay", not player.config.autoplay)
         await ctx.send(
             embed=Embed(
                 f"Autoplay is set to {'enabled' if config.autoplay else 'disabled'}."
@@ -273,8 +331,8 @@ class Music(commands.Cog):
     async def shuffle(self, ctx: commands.Context) -> None:
         """Enables/disables player's shuffle mode."""
 
-        player = get_player(ctx)
-        config = player.update_config("shuffle", not player.config.shuffle)
+        player = await get_player(ctx)
+        config = await player.update_config("shuffle", not player.config.shuffle)
         await ctx.send(
             embed=Embed(
                 f"Shuffle is set to {'enabled' if config.shuffle else 'disabled'}."
@@ -282,6 +340,24 @@ class Music(commands.Cog):
             delete_after=5,
         )
 
+    @commands.command()
+    @commands.guild_only()
+    @commands.check(has_player)
+    @commands.check(in_voice)
+    async def noduplicates(self, ctx: commands.Context) -> None:
+        """Enables/disables adding songs that are already in the queue."""
+
+        player = await get_player(ctx)
+        config = await player.update_config(
+            "noduplicates", not player.config.noduplicates
+        )
+        await ctx.send(
+            embed=Embed(
+                f"No duplicates is set to {'enabled' if config.noduplicates else 'disabled'}."
+            ),
+            delete_after=5,
+        )
+
     @commands.command(aliases=["np"])
     @commands.guild_only()
     @commands.check(has_player)
@@ -289,14 +365,14 @@ class Music(commands.Cog):
     async def nowplaying(self, ctx: commands.Context) -> None:
         """Displays in brief description of the current playing."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
         config = player.config
 
-        if not player.connection.is_playing():
-            return await ctx.send(embed=Embed("No song playing."), delete_after=5)
-
         now_playing = player.now_playing
 
+        if not player.connection.is_playing() or not now_playing:
+            return await ctx.send(embed=Embed("No song playing."), delete_after=5)
+
         footer = [
             str(now_playing.requested),
             f"Volume: {config.volume}%",
@@ -308,7 +384,10 @@ class Music(commands.Cog):
         embed = Embed()
         embed.add_field("Uploader", now_playing.uploader)
         embed.add_field("Upload Date", now_playing.upload_date)
-        embed.add_field("Duration", format_seconds(now_playing.duration))
+        embed.add_field(
+            "Duration",
+            format_seconds(now_playing.duration) if now_playing.duration else "N/A",
+        )
         embed.add_field("Views", now_playing.view_count)
         embed.add_field("Description", now_playing.description, inline=False)
         embed.set_author(
@@ -328,7 +407,7 @@ class Music(commands.Cog):
     async def playlist(self, ctx: commands.Context) -> None:
         """List down all songs in the player's queue."""
 
-        player = get_player(ctx)
+        player = await get_player(ctx)
         config = player.config
         queue = player.queue
         embeds = []
@@ -15,6 +15,8 @@ from discord.ext import commands
 
 from .. import __author__, __title__, __version__, bot, env
 from ..classes import Embed
+from ..classes.audio_cache import audio_cache
+from ..classes.ytdl import search_cache, ytdl_pool
 from ..helpers.date import date_format, format_seconds
 from ..helpers.log import Log
 
@@ -91,6 +93,25 @@ class Utility(commands.Cog):
         embed.add_field("Channels", sum(1 for _ in bot.get_all_channels()))
         embed.add_field("Users", len(bot.users))
         embed.add_field("Commands Executed", len(bot.commands_executed))
+        embed.add_field("Messages Skipped", bot.messages_skipped)
+        embed.add_field(
+            "Ytdl Queue",
+            f"{ytdl_pool.stats.running} running, {ytdl_pool.stats.pending} pending",
+        )
+        embed.add_field(
+            "Search Cache",
+            f"{search_cache.stats.hit_rate:.0%} hit rate ({search_cache.stats.size} cached)",
+        )
+        embed.add_field(
+            "Config Cache",
+            f"{bot.db.cache_info.hit_rate:.0%} hit rate ({bot.db.cache_info.size} cached)",
+        )
+        embed.add_field(
+            "Audio Cache",
+            f"{audio_cache.stats.files} files ({audio_cache.stats.size / 1024000:.2f} MB)"
+            if audio_cache.stats.enabled
+            else "Disabled",
+        )
         embed.add_field(
             "Ram Usage",
             f"Approximately {(process.memory_info().rss / 1024000):.2f} MB",
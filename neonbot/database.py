@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import copy
 import logging
 from time import time
-from typing import cast
+from typing import Any, Optional, Tuple, Union, cast
 
 from addict import Dict
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 
 from .env import env
 from .helpers.log import Log
@@ -13,85 +15,271 @@ from .helpers.log import Log
 log = cast(Log, logging.getLogger(__name__))
 
 
+def get_changes(old: dict, new: dict, prefix: str = "") -> Tuple[dict, dict]:
+    """Returns the dotted paths that were set and unset between two documents."""
+
+    updated: dict = {}
+    removed: dict = {}
+
+    for key, value in new.items():
+        path = prefix + key
+        if isinstance(value, dict) and isinstance(old.get(key), dict):
+            child_updated, child_removed = get_changes(old[key], value, path + ".")
+            updated.update(child_updated)
+            removed.update(child_removed)
+        elif key not in old or old[key] != value:
+            updated[path] = value
+
+    for key in old.keys() - new.keys():
+        removed[prefix + key] = ""
+
+    return updated, removed
+
+
+def get_update_query(old: dict, new: dict) -> dict:
+    updated, removed = get_changes(old, new)
+    query = {}
+
+    if updated:
+        query["$set"] = updated
+    if removed:
+        query["$unset"] = removed
+
+    return query
+
+
 class GuildDatabase:
-    def __init__(self, db: MongoClient, guild_id: int) -> None:
+    def __init__(self, db: AsyncIOMotorDatabase, guild_id: int) -> None:
         self.db = db
         self.guild_id = str(guild_id)
-        self.refresh()
+        self.set_config(None)
 
-    def refresh(self) -> GuildDatabase:
-        self.config = Dict(self.db.servers.find_one({"server_id": self.guild_id}))
+    def set_config(self, document: Optional[dict]) -> None:
+        self._document = copy.deepcopy(document or {})
+        self.config = Dict(document)
+        self.aliases = {alias.name: alias for alias in self.config.aliases or []}
+
+    async def refresh(self) -> GuildDatabase:
+        self.set_config(await self.db.servers.find_one({"server_id": self.guild_id}))
         return self
 
-    def update(self) -> GuildDatabase:
-        if isinstance(self.config, Dict):
-            self.config = self.config.to_dict()
-        self.db.servers.update_one({"server_id": self.guild_id}, {"$set": self.config})
-        return self.refresh()
+    async def update(self) -> GuildDatabase:
+        query = get_update_query(self._document, self.config.to_dict())
+
+        if query:
+            self.set_config(
+                await self.db.servers.find_one_and_update(
+                    {"server_id": self.guild_id},
+                    query,
+                    return_document=ReturnDocument.AFTER,
+                )
+            )
+        return self
 
 
 class BotDatabase:
-    def __init__(self, db: MongoClient) -> None:
+    def __init__(self, db: AsyncIOMotorDatabase) -> None:
         self.db = db
-        self.refresh()
+        self.set_settings(None)
 
-    def refresh(self) -> BotDatabase:
-        self.settings = Dict(self.db.settings.find_one())
+    def set_settings(self, document: Optional[dict]) -> None:
+        self._document = copy.deepcopy(document or {})
+        self.settings = Dict(document)
+
+    async def refresh(self) -> BotDatabase:
+        self.set_settings(await self.db.settings.find_one())
         return self
 
-    def update(self) -> BotDatabase:
-        if isinstance(self.settings, Dict):
-            self.settings = self.settings.to_dict()
-        self.db.settings.update_one({}, {"$set": self.settings})
-        return self.refresh()
+    async def update(self) -> BotDatabase:
+        query = get_update_query(self._document, self.settings.to_dict())
+
+        if query:
+            self.set_settings(
+                await self.db.settings.find_one_and_update(
+                    {}, query, return_document=ReturnDocument.AFTER
+                )
+            )
+        return self
 
 
 class Database:
-    def __init__(self) -> None:
-        self.db = self.load_database()
+    def __init__(
+        self, db: Optional[Union[AsyncIOMotorDatabase, MemoryDatabase]] = None
+    ) -> None:
+        # only None until connect(), which runs before anything else
+        self.db = cast(Union[AsyncIOMotorDatabase, MemoryDatabase], db)
+        self.guilds: dict = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def connect(self) -> Database:
+        if self.db is None:
+            self.db = await self.load_database()
+        return self
 
-    def load_database(self) -> MongoClient:
+    async def load_database(self) -> AsyncIOMotorDatabase:
         mongo_url = env.str("MONGO_URL")
         db_name = env.str("MONGO_DBNAME")
-        client = MongoClient(mongo_url)
+        client = AsyncIOMotorClient(mongo_url)
 
         start_time = time()
         log.info(f"Connecting to Database...")
-        client.admin.command("ismaster")
+        await client.admin.command("ismaster")
         log.info(f"MongoDB connection established in {(time() - start_time):.2f}s")
         return client[db_name]
 
-    def process_database(self, guilds: list) -> None:
-        for guild in guilds:
-            count = self.db.servers.find({"server_id": str(guild.id)}).count
-
-            if count == 0:
-                self.create_collection(guild.id)
-
-    def create_collection(self, guild_id: int) -> None:
-        self.db.servers.insert_one(
-            {
-                "server_id": str(guild_id),
-                "prefix": env.str("PREFIX"),
-                "deleteoncmd": False,
-                "strictmode": False,
-                "aliases": [],
-                "channel": {},
-                "music": {
-                    "volume": 100,
-                    "autoplay": False,
-                    "repeat": "off",
-                    "autoresume": False,
-                    "roles": {},
-                },
-            }
+    async def process_database(self, guilds: list) -> None:
+        start_time = time()
+        existing = set(await self.db.servers.distinct("server_id"))
+        missing = [guild.id for guild in guilds if str(guild.id) not in existing]
+
+        if missing:
+            for guild_id in missing:
+                self.invalidate_guild(guild_id)
+            await self.db.servers.insert_many(
+                [self.get_default_config(guild_id) for guild_id in missing]
+            )
+
+        log.info(
+            f"Processed {len(guilds)} guilds ({len(missing)} created) "
+            f"in {(time() - start_time):.2f}s"
         )
-        self.db.servers.insert_one(
+
+    def get_default_config(self, guild_id: int) -> dict:
+        return {
+            "server_id": str(guild_id),
+            "prefix": env.str("PREFIX"),
+            "deleteoncmd": False,
+            "strictmode": False,
+            "aliases": [],
+            "channel": {},
+            "music": {
+                "volume": 100,
+                "autoplay": False,
+                "repeat": "off",
+                "autoresume": False,
+                "crossfade": 0,
+                "noduplicates": False,
+                "roles": {},
+            },
+        }
+
+    async def create_collection(self, guild_id: int) -> None:
+        self.invalidate_guild(guild_id)
+        await self.db.servers.insert_one(self.get_default_config(guild_id))
+        await self.db.servers.insert_one(
             {"status": "online", "game": {"type": "WATCHING", "name": "NANI?!"}}
         )
 
-    def get_guild(self, guild_id: int) -> GuildDatabase:
-        return GuildDatabase(self.db, guild_id)
+    async def get_guild(self, guild_id: int) -> GuildDatabase:
+        key = str(guild_id)
+        guild = self.guilds.get(key)
+
+        if guild is None:
+            self.cache_misses += 1
+            guild = await GuildDatabase(self.db, guild_id).refresh()
+            # another coroutine may have loaded the same guild while we awaited
+            guild = self.guilds.setdefault(key, guild)
+        else:
+            self.cache_hits += 1
+
+        return guild
+
+    def get_cached_guild(self, guild_id: int) -> Optional[GuildDatabase]:
+        return self.guilds.get(str(guild_id))
+
+    def invalidate_guild(self, guild_id: int) -> None:
+        self.guilds.pop(str(guild_id), None)
+
+    @property
+    def cache_info(self) -> Dict:
+        total = self.cache_hits + self.cache_misses
+
+        return Dict(
+            hits=self.cache_hits,
+            misses=self.cache_misses,
+            size=len(self.guilds),
+            hit_rate=self.cache_hits / total if total else 0,
+        )
+
+    async def get_settings(self) -> BotDatabase:
+        return await BotDatabase(self.db).refresh()
+
+
+class MemoryCollection:
+    """
+    In-memory stand-in for the subset of the motor collection API
+    used by the database classes. Meant for tests and local runs.
+    """
+
+    def __init__(self) -> None:
+        self.documents: list = []
+
+    @staticmethod
+    def _match(document: dict, query: Optional[dict]) -> bool:
+        return all(document.get(key) == value for key, value in (query or {}).items())
+
+    @staticmethod
+    def _update(document: dict, query: dict) -> None:
+        for key, value in query.get("$set", {}).items():
+            *parents, field = key.split(".")
+            target = document
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[field] = copy.deepcopy(value)
+
+        for key in query.get("$unset", {}):
+            *parents, field = key.split(".")
+            target = document
+            for parent in parents:
+                target = target.get(parent, {})
+            target.pop(field, None)
+
+    async def find_one(self, query: Optional[dict] = None) -> Optional[dict]:
+        for document in self.documents:
+            if self._match(document, query):
+                return copy.deepcopy(document)
+        return None
+
+    async def count_documents(self, query: dict) -> int:
+        return sum(1 for document in self.documents if self._match(document, query))
+
+    async def distinct(self, key: str) -> list:
+        values: list = []
+        for document in self.documents:
+            if key in document and document[key] not in values:
+                values.append(document[key])
+        return values
+
+    async def insert_one(self, document: dict) -> None:
+        self.documents.append(copy.deepcopy(document))
+
+    async def insert_many(self, documents: list) -> None:
+        for document in documents:
+            await self.insert_one(document)
+
+    async def update_one(self, query: dict, update: dict) -> None:
+        await self.find_one_and_update(query, update)
+
+    async def find_one_and_update(
+        self, query: dict, update: dict, *, return_document: bool = False
+    ) -> Optional[dict]:
+        for document in self.documents:
+            if self._match(document, query):
+                before = copy.deepcopy(document)
+                self._update(document, update)
+                return copy.deepcopy(document) if return_document else before
+        return None
+
+
+class MemoryDatabase:
+    def __init__(self) -> None:
+        self.collections: dict = {}
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_") or name == "collections":
+            raise AttributeError(name)
+        return self.collections.setdefault(name, MemoryCollection())
 
-    def get_settings(self) -> BotDatabase:
-        return BotDatabase(self.db)
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return getattr(self, name)
@@ -25,6 +25,29 @@ FFMPEG_OPTIONS = (
     "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5 -err_detect buffer" # deleted -err_detect ignore_err
 )
 
+SPOTIFY_CONCURRENCY = 5
+SPOTIFY_PAGE_CONCURRENCY = 5
+
+TRACK_CACHE_TTL = 60 * 60 * 24 * 30
+TRACK_CACHE_SIZE = 20000
+
+SEARCH_CACHE_TTL = 60 * 60 * 6
+SEARCH_CACHE_SIZE = 500
+RELATED_CACHE_TTL = 60 * 60 * 6
+RELATED_CACHE_SIZE = 500
+
+AUTOPLAY_BUFFER_SIZE = 2
+AUTOPLAY_HISTORY_SIZE = 50
+
+# seconds between metadata extractions of queued stubs
+HYDRATE_INTERVAL = 2
+
+# seconds to wait for more changes before editing the player panel
+PANEL_DEBOUNCE = 1
+
+# seconds before the end of a song to start the upcoming song's ffmpeg
+WARM_UP_SECONDS = 10
+
 YOUTUBE_REGEX = r"^(http(s)?:\/\/)?((w){3}.)?youtu(be|.be)?(\.com)?\/.+"
 SPOTIFY_REGEX = r"^(spotify:|https:\/\/[a-z]+\.spotify\.com\/)"
 
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import Union
+from typing import Optional, Union
 
 from pytz import timezone
 
@@ -19,3 +19,17 @@ def format_seconds(secs: Union[int, float]) -> str:
     if formatted.startswith("0:"):
         return formatted[2:]
     return formatted
+
+
+def parse_seconds(text: str) -> Optional[int]:
+    """Parses [[hh:]mm:]ss into seconds. Returns None if it's invalid."""
+
+    parts = text.split(":")
+
+    if len(parts) > 3 or not all(part.isdigit() for part in parts):
+        return None
+
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
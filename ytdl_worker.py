@@ -0,0 +1,46 @@
+"""
+youtube_dl jobs run by the extraction pool.
+
+This module must not import neonbot, since importing it creates the bot.
+Process pool workers import it on their own, without the bot's sockets,
+threads and event loop. Spawned workers also import the main module, so
+main.py only imports neonbot when it runs.
+"""
+
+from typing import Any
+
+import youtube_dl
+
+ytdl_instances: dict = {}
+
+
+def get_params_key(extra_params: dict) -> tuple:
+    return tuple(sorted(extra_params.items()))
+
+
+def get_youtube_dl(extra_params: dict) -> youtube_dl.YoutubeDL:
+    key = get_params_key(extra_params)
+
+    if key not in ytdl_instances:
+        ytdl_instances[key] = youtube_dl.YoutubeDL(
+            {
+                "default_search": "ytsearch5",
+                "format": "95/bestaudio",
+                "quiet": True,
+                "nocheckcertificate": True,
+                "ignoreerrors": True,
+                "extract_flat": "in_playlist",
+                "geo_bypass": True,
+                **extra_params,
+            }
+        )
+
+    return ytdl_instances[key]
+
+
+def run_youtube_dl(extra_params: dict, method: str, *args: Any, **kwargs: Any) -> Any:
+    # module level so the job can be pickled to a worker process,
+    # where it uses the YoutubeDL instances cached in that process
+    return getattr(get_youtube_dl(extra_params), method)(
+        *args, download=False, **kwargs
+    )